@@ -101,10 +101,19 @@ app.get('/ens/resolve/:nameOrAddress', async (req: Request, res: Response) => {
   }
 });
 
+// Last leaderboard from the graph engine, revalidated with its ETag
+let leaderboardCache: { etag: string; data: unknown } | null = null;
+
 app.get('/leaderboard', async (_req, res) => {
   try {
-    const { data } = await axios.get(`${GRAPH_URL}/leaderboard`);
-    res.json(data);
+    const response = await axios.get(`${GRAPH_URL}/leaderboard`, {
+      headers: leaderboardCache ? { 'If-None-Match': leaderboardCache.etag } : {},
+      validateStatus: (status) => status === 200 || status === 304,
+    });
+    if (response.status === 200 && response.headers.etag) {
+      leaderboardCache = { etag: response.headers.etag, data: response.data };
+    }
+    res.json(response.status === 304 && leaderboardCache ? leaderboardCache.data : response.data);
   } catch (e) {
     console.error(e);
     res.status(500).json({ error: 'Failed to fetch leaderboard' });
@@ -0,0 +1,1222 @@
+"""Ad-hoc performance checks for the graph engine.
+
+Run a single benchmark with `python benchmark.py <name> [size]`, or
+all of them with no arguments.
+"""
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import networkx as nx
+
+from pagerank import DignitasPageRank
+
+
+def _random_interactions(num_agents: int, num_edges: int, seed: int = 42):
+    rng = random.Random(seed)
+    agents = [f"0x{i:040x}" for i in range(num_agents)]
+    now = datetime.utcnow()
+    for _ in range(num_edges):
+        src, dst = rng.sample(agents, 2)
+        itype = rng.choice(["x402", "x402", "feedback", "negative_feedback"])
+        yield src, dst, itype, now - timedelta(days=rng.randint(0, 60))
+
+
+def _max_error(scores: dict, reference: dict) -> float:
+    max_ref = max(reference.values())
+    return max(abs(scores[a] - reference[a] / max_ref) for a in reference)
+
+
+def _reference(engine: DignitasPageRank) -> dict:
+    return nx.pagerank(engine.graph, alpha=engine.DAMPING, weight="weight", tol=1e-12)
+
+
+def bench_incremental(num_agents: int = 5000, num_edges: int = 50000, updates: int = 500):
+    """Warm-start and forward-push updates vs. a cold recompute, over many updates."""
+    engine = DignitasPageRank(incremental=True)
+    for src, dst, itype, ts in _random_interactions(num_agents, num_edges):
+        engine.add_interaction(src, dst, itype, ts)
+
+    started = time.perf_counter()
+    engine.snapshot()
+    cold_ms = (time.perf_counter() - started) * 1000
+    cold_iterations = engine.last_iterations
+    print(f"cold: {cold_iterations} iterations, {cold_ms:.1f} ms")
+
+    rng = random.Random(7)
+    agents = list(engine.graph)
+    worst, worst_mass, worst_settled = 0.0, 0.0, 0.0
+    methods: dict = {}
+    update_ms = []
+    for i in range(updates):
+        src, dst = rng.sample(agents, 2)
+        engine.add_interaction(src, dst, "x402")
+        snap = engine.snapshot()
+        methods[snap.method] = methods.get(snap.method, 0) + 1
+        update_ms.append(snap.compute_ms)
+        # Rank mass stays at 1 up to the residuals push carries over;
+        # counting those in, it is off by no more than the dropped mass.
+        mass = sum(engine._rank.values())
+        carried = sum(engine._residual.values()) / (1 - engine.DAMPING)
+        worst_mass = max(worst_mass, abs(mass - 1))
+        worst_settled = max(worst_settled, abs(mass + carried - 1))
+        if (i + 1) % 50 and i + 1 != updates:
+            continue
+        error = _max_error(snap.scores, _reference(engine))
+        worst = max(worst, error)
+        print(
+            f"update {i + 1}: {snap.method}, {snap.compute_ms:.2f} ms, "
+            f"{engine.last_pushes} pushes, max error {error:.2e}, "
+            f"rank mass off by {worst_mass:.1e}"
+        )
+    print(
+        f"{updates} updates: {methods}, mean {sum(update_ms) / updates:.2f} ms "
+        f"(cold {cold_ms:.1f} ms)"
+    )
+
+    # New agent: N changes, so this takes the warm-start path.
+    engine.add_interaction("0xnew", agents[0], "x402")
+    snap = engine.snapshot()
+    reference = _reference(engine)
+    worst = max(worst, _max_error(snap.scores, reference))
+    print(
+        f"new agent: {snap.method}, {snap.compute_ms:.2f} ms, "
+        f"{engine.last_iterations} iterations (cold: {cold_iterations})"
+    )
+
+    print(
+        f"worst max error vs nx.pagerank: {worst:.2e}, rank mass off by up to "
+        f"{worst_mass:.1e} ({worst_settled:.1e} counting carried residuals)"
+    )
+    carry_bound = len(agents) * engine.TOLERANCE / (1 - engine.DAMPING)
+    return (
+        worst < 1e-3
+        and worst_settled <= engine.MAX_PUSH_DRIFT + 1e-9
+        and worst_mass <= engine.MAX_PUSH_DRIFT + carry_bound
+    )
+
+
+def bench_backends(num_agents: int = 20000, num_edges: int = 200000):
+    """Memory, ingest and PageRank time of the NetworkX vs. sparse backends."""
+    interactions = list(_random_interactions(num_agents, num_edges))
+    results = {}
+    for backend in ("networkx", "sparse"):
+        engine = DignitasPageRank(backend=backend)
+        tracemalloc.start()
+        started = time.perf_counter()
+        for src, dst, itype, ts in interactions:
+            engine.add_interaction(src, dst, itype, ts)
+        engine.flush()
+        engine.store.compact()
+        ingest_s = time.perf_counter() - started
+        memory_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        results[backend] = engine.compute_scores()
+        compute_ms = (time.perf_counter() - started) * 1000
+        print(
+            f"{backend}: {memory_mb:.1f} MB, ingest {num_edges / ingest_s:,.0f} edges/s, "
+            f"PageRank {compute_ms:.1f} ms"
+        )
+
+    error = max(abs(results["networkx"][a] - results["sparse"][a]) for a in results["networkx"])
+    print(f"max score difference between backends: {error:.2e}")
+    return error < 1e-6
+
+
+def bench_decay(num_agents: int = 200, num_edges: int = 20000, days: int = 720):
+    """Read-time decay after months of simulated uptime vs. a brute-force sum."""
+    rng = random.Random(3)
+    engine = DignitasPageRank(backend="sparse")
+    engine.REBASE_HALF_LIVES = 4  # Force a few epoch rebases along the way
+    start = engine.decay_epoch
+    agents = [f"0x{i:040x}" for i in range(num_agents)]
+    log = []
+    for i in range(num_edges):
+        ts = start + timedelta(days=days * i / num_edges)
+        src, dst = rng.sample(agents[:20], 2)
+        itype = rng.choice(["x402", "feedback"])
+        engine.add_interaction(src, dst, itype, ts)
+        log.append((src, dst, itype, ts))
+
+    at = start + timedelta(days=days + 10)
+    expected = {}
+    for src, dst, itype, ts in log:
+        base = engine.WEIGHT_X402 if itype == "x402" else engine.WEIGHT_FEEDBACK
+        age_days = (at - ts).total_seconds() / 86400
+        expected[(src, dst)] = expected.get((src, dst), 0) + base * 0.5 ** (
+            age_days / engine.HALF_LIFE_DAYS
+        )
+    error = max(
+        abs(engine.edge_weight(src, dst, at) - w) / w for (src, dst), w in expected.items()
+    )
+    print(f"epoch moved {(engine.decay_epoch - start).days} days; max relative error {error:.2e}")
+
+    big = DignitasPageRank(backend="sparse")
+    for src, dst, itype, ts in _random_interactions(20000, 200000):
+        big.add_interaction(src, dst, itype, ts)
+    big.flush()
+    big.store.compact()
+    started = time.perf_counter()
+    big.decayed_adjacency()
+    print(f"decayed adjacency for 200k interactions: {(time.perf_counter() - started) * 1000:.1f} ms")
+    return error < 1e-9
+
+
+def bench_batch_ingest(num_agents: int = 20000, num_edges: int = 200000):
+    """One add_interaction call per interaction vs. a single batched update."""
+    interactions = list(_random_interactions(num_agents, num_edges))
+    for backend in ("networkx", "sparse"):
+        engine = DignitasPageRank(backend=backend)
+        started = time.perf_counter()
+        for src, dst, itype, ts in interactions:
+            engine.add_interaction(src, dst, itype, ts)
+        single_s = time.perf_counter() - started
+
+        engine = DignitasPageRank(backend=backend)
+        started = time.perf_counter()
+        engine.add_interactions(interactions)
+        batch_s = time.perf_counter() - started
+        print(
+            f"{backend}: single {num_edges / single_s:,.0f}/s, "
+            f"batch {num_edges / batch_s:,.0f}/s"
+        )
+
+
+def bench_durability(num_interactions: int = 10_000_000, num_agents: int = 100_000):
+    """Log throughput, then startup from log replay alone and from a snapshot."""
+    from relevancy import RelevancyEngine
+    from storage import Persistence
+
+    data_dir = tempfile.mkdtemp(prefix="dignitas-bench-")
+    chunk = 100_000
+    try:
+        writer = Persistence(DignitasPageRank(backend="sparse"), RelevancyEngine(), data_dir)
+        writer.recover()
+        started = time.perf_counter()
+        written = 0
+        while written < num_interactions:
+            size = min(chunk, num_interactions - written)
+            batch = list(_random_interactions(num_agents, size, seed=written))
+            writer.add_interactions(batch)
+            written += size
+        write_s = time.perf_counter() - started
+        writer.log.close()  # Simulate a crash: no final snapshot
+        print(f"logged {written:,} interactions at {written / write_s:,.0f}/s")
+
+        reader = Persistence(DignitasPageRank(backend="sparse"), RelevancyEngine(), data_dir)
+        reader.recover()
+        stats = reader.last_recovery
+        print(
+            f"replay-only startup: {stats['total_s']:.1f} s "
+            f"({stats['replay_per_s']:,.0f} records/s)"
+        )
+        reader.snapshot()
+        reader.log.close()
+
+        restored = Persistence(DignitasPageRank(backend="sparse"), RelevancyEngine(), data_dir)
+        restored.recover()
+        print(f"snapshot startup: {restored.last_recovery['total_s']:.2f} s")
+        restored.log.close()
+        same = (
+            restored.engine.interaction_count == written
+            and restored.engine.agent_count() == reader.engine.agent_count()
+        )
+        print(f"state matches after restart: {same}")
+        return same
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def _mmap_reader_scores(path: str) -> dict:
+    reader = DignitasPageRank(backend="mmap", path=path, readonly=True)
+    return reader.compute_scores()
+
+
+def bench_mmap(num_edges: int = 2_000_000, num_agents: int = 100_000):
+    """Streamed PageRank over the memory-mapped edge store, plus a reader process."""
+    import multiprocessing
+
+    path = tempfile.mkdtemp(prefix="dignitas-edges-")
+    try:
+        engine = DignitasPageRank(backend="mmap", path=path)
+        sparse = DignitasPageRank(backend="sparse")
+        chunk = 200_000
+        for start in range(0, num_edges, chunk):
+            batch = list(_random_interactions(num_agents, min(chunk, num_edges - start), seed=start))
+            engine.add_interactions(batch)
+            sparse.add_interactions(batch)
+        engine.flush()
+        engine.store.compact()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        scores = engine.compute_scores()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        on_disk_mb = sum(
+            os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)
+        ) / 1e6
+        print(
+            f"mmap: {num_edges:,} rows ({on_disk_mb:.0f} MB on disk), PageRank "
+            f"{elapsed_ms:.0f} ms in {engine.last_iterations} streamed passes, "
+            f"peak Python allocations {peak_mb:.0f} MB"
+        )
+
+        reference = sparse.compute_scores()
+        error = max(abs(scores[a] - reference[a]) for a in reference)
+        print(f"max difference vs sparse backend: {error:.2e}")
+
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            started = time.perf_counter()
+            reader_scores = pool.apply(_mmap_reader_scores, (path,))
+            print(f"read-only process: {(time.perf_counter() - started) * 1000:.0f} ms incl. spawn")
+        reader_error = max(abs(scores[a] - reader_scores[a]) for a in scores)
+        print(f"reader process max difference: {reader_error:.2e}")
+        return error < 1e-6 and reader_error < 1e-9
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def bench_ranking(num_agents: int = 1_000_000, queries: int = 1000):
+    """Ranking-index queries vs. sorting the score dict per request."""
+    from pagerank import ScoreSnapshot
+
+    rng = random.Random(5)
+    scores = {f"0x{i:040x}": rng.random() for i in range(num_agents)}
+    started = time.perf_counter()
+    snap = ScoreSnapshot(scores, 1, 0.0)
+    print(f"index build for {num_agents:,} agents: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    started = time.perf_counter()
+    sorted(scores.items(), key=lambda x: x[1], reverse=True)[:50]
+    print(f"full sort (old top-N): {(time.perf_counter() - started) * 1000:.0f} ms per request")
+
+    agents = list(scores)
+    started = time.perf_counter()
+    for _ in range(queries):
+        snap.top(50)
+        snap.above(0.9, 50)
+        agent = rng.choice(agents)
+        snap.rank(agent)
+        snap.percentile(agent)
+    per_query_us = (time.perf_counter() - started) / queries * 1e6
+    print(f"top-50 + min_score range + rank + percentile: {per_query_us:.0f} us per request")
+    return snap.top(50) == sorted(scores.items(), key=lambda x: x[1], reverse=True)[:50]
+
+
+def bench_prefilter(num_agents: int = 100_000, queries: int = 200):
+    """Spec index build and query time, and its ranking on the demo specs."""
+    from relevancy import RelevancyEngine
+
+    rng = random.Random(11)
+    words = [f"skill{i}" for i in range(5000)]
+    engine = RelevancyEngine()
+    started = time.perf_counter()
+    for i in range(num_agents):
+        engine.register_agent(
+            f"0x{i:040x}",
+            {
+                "name": f"Agent {i}",
+                "description": " ".join(rng.choices(words, k=30)),
+                "capabilities": rng.choices(words, k=6),
+                "tags": rng.choices(words, k=4),
+            },
+        )
+    build_s = time.perf_counter() - started
+    print(f"indexed {num_agents:,} specs in {build_s:.1f} s")
+
+    candidates = [f"0x{i:040x}" for i in range(50)]
+    started = time.perf_counter()
+    for _ in range(queries):
+        engine.index.search(" ".join(rng.choices(words, k=4)), candidates)
+    per_query_ms = (time.perf_counter() - started) / queries * 1000
+    print(f"query over 50 candidates: {per_query_ms:.2f} ms")
+
+    started = time.perf_counter()
+    for _ in range(queries):
+        engine.index.search(" ".join(rng.choices(words, k=4)))
+    per_query_ms = (time.perf_counter() - started) / queries * 1000
+    print(f"query over all {num_agents:,} specs: {per_query_ms:.2f} ms")
+
+    import main
+
+    main.seed_demo_data()
+    scores = main.relevancy_engine.index.search("book me a cheap flight")
+    best = max(scores, key=scores.get)
+    print(f"'book me a cheap flight' -> {main.relevancy_engine.get_agent_spec(best)['name']}")
+    return main.relevancy_engine.get_agent_spec(best)["category"] == "travel"
+
+
+def bench_filter(num_agents: int = 100_000, queries: int = 1000):
+    """Facet filters (category + tag + capability) over registered specs."""
+    from pagerank import ScoreSnapshot
+    from spec_index import FacetIndex
+
+    rng = random.Random(13)
+    categories = [f"category{i}" for i in range(20)]
+    tags = [f"tag{i}" for i in range(200)]
+    capabilities = [f"capability{i}" for i in range(1000)]
+    index = FacetIndex()
+    specs = {}
+    for i in range(num_agents):
+        spec = {
+            "category": rng.choice(categories),
+            "tags": rng.sample(tags, 4),
+            "capabilities": rng.sample(capabilities, 6),
+        }
+        specs[f"0x{i:040x}"] = spec
+        index.add(f"0x{i:040x}", spec)
+    snap = ScoreSnapshot({a: rng.random() for a in specs}, 1, 0.0)
+
+    started = time.perf_counter()
+    for _ in range(queries):
+        index.filter(rng.choice(categories), [rng.choice(tags)], [rng.choice(capabilities)])
+    filter_us = (time.perf_counter() - started) / queries * 1e6
+    started = time.perf_counter()
+    for _ in range(queries):
+        index.filter(rng.choice(categories), [rng.choice(tags)])
+    broad_us = (time.perf_counter() - started) / queries * 1e6
+    print(
+        f"{num_agents:,} agents: category+tag+capability filter {filter_us:.0f} us, "
+        f"category+tag {broad_us:.0f} us"
+    )
+
+    category, tag = categories[0], tags[0]
+    matched = index.filter(category, [tag])
+    started = time.perf_counter()
+    top = snap.above_among(matched, 0.5, 50)
+    print(
+        f"top 50 of {len(matched)} matches: "
+        f"{(time.perf_counter() - started) * 1e6:.0f} us"
+    )
+    expected = [
+        (a, s) for a, s in snap.top(num_agents)
+        if specs[a]["category"] == category and tag in specs[a]["tags"] and s >= 0.5
+    ][:50]
+    return top == expected
+
+
+def bench_retrieval(num_agents: int = 1_000_000, queries: int = 100):
+    """Two-stage discovery, stage one: candidates from every agent."""
+    from pagerank import ScoreSnapshot
+    from relevancy import RelevancyEngine
+
+    rng = random.Random(19)
+    words = [f"skill{i}" for i in range(2000)]
+    categories = [f"category{i}" for i in range(20)]
+    engine = RelevancyEngine()
+    started = time.perf_counter()
+    for i in range(num_agents):
+        engine.register_agent(
+            f"0x{i:040x}",
+            {
+                "name": f"Agent {i}",
+                "description": " ".join(rng.choices(words, k=10)),
+                "capabilities": rng.choices(words, k=3),
+                "category": rng.choice(categories),
+            },
+        )
+    # Ranked last by PageRank, but the only match for its term
+    needle = f"0x{num_agents - 1:040x}"
+    engine.register_agent(needle, {"name": "Zyzzyva", "description": "zyzzyva"})
+    scores = {f"0x{i:040x}": 1 - i / num_agents for i in range(num_agents)}
+    snap = ScoreSnapshot(scores, 1, 0.0)
+    print(f"indexed {num_agents:,} specs in {time.perf_counter() - started:.1f} s")
+
+    started = time.perf_counter()
+    engine.candidates("skill1", snap, 50)
+    print(f"first query (postings arrays): {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    cases = {
+        "no query": lambda: engine.candidates(None, snap, 50),
+        "1-term query": lambda: engine.candidates(rng.choice(words), snap, 50),
+        "3-term query": lambda: engine.candidates(" ".join(rng.sample(words, 3)), snap, 50),
+        "3 terms, depth 1000": lambda: engine.candidates(
+            " ".join(rng.sample(words, 3)), snap, 1000
+        ),
+        "3 terms + category": lambda: engine.candidates(
+            " ".join(rng.sample(words, 3)), snap, 50, category=rng.choice(categories)
+        ),
+    }
+    for name, run in cases.items():
+        started = time.perf_counter()
+        for _ in range(queries):
+            run()
+        print(f"{name}: {(time.perf_counter() - started) / queries * 1000:.1f} ms")
+
+    fresh = ScoreSnapshot.from_ranked(
+        snap.ranked_agents, snap.ranked_scores, 2, 0.0, "full", snap.computed_at
+    )
+    started = time.perf_counter()
+    engine.candidates(" ".join(rng.sample(words, 3)), fresh, 50)
+    print(f"3-term query, new snapshot: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # Same top-50 as scoring every agent one by one
+    query = " ".join(words[:3])
+    text = engine.index.search(query)
+    brute = sorted(
+        ((a, s * 0.4 + text.get(a, 0.0) * 0.6) for a, s in scores.items()),
+        key=lambda x: x[1],
+        reverse=True,
+    )[:50]
+    found = engine.candidates(query, snap, 50)
+    exact = [a for a, _ in brute] == [a for a, _, _ in found]
+    discovered = engine.candidates("zyzzyva", snap, 50)[0][0] == needle
+    print(f"matches brute force: {exact}, last-ranked match found: {discovered}")
+    return exact and discovered
+
+
+def bench_concurrency(writes: int = 20000, writers: int = 4, readers: int = 4):
+    """Thousands of writes interleaved with snapshot reads and background recomputes."""
+    import threading
+
+    from scheduler import RecomputeScheduler
+
+    interactions = list(_random_interactions(2000, writes))
+    ok = True
+    for backend in ("networkx", "sparse"):
+        engine = DignitasPageRank(backend=backend)
+        scheduler = RecomputeScheduler(
+            engine, interval_s=0.05, max_pending_edges=500, min_staleness_s=0.01
+        )
+        scheduler.start()
+        stop = threading.Event()
+        latencies, problems = [], []
+
+        def write(part):
+            for src, dst, itype, ts in part:
+                engine.add_interaction(src, dst, itype, ts)
+                scheduler.notify_write()
+
+        def read():
+            while not stop.is_set():
+                started = time.perf_counter()
+                snap = scheduler.snapshot()
+                top = snap.top(10)
+                snap.above(0.5, 20)
+                if top:
+                    snap.rank(top[-1][0])
+                latencies.append(time.perf_counter() - started)
+                if len(snap.ranked_agents) != len(snap.scores) or any(
+                    a[1] < b[1] for a, b in zip(top, top[1:])
+                ):
+                    problems.append(snap.version)
+
+        threads = [threading.Thread(target=read) for _ in range(readers)]
+        threads += [
+            threading.Thread(target=write, args=(interactions[i::writers],))
+            for i in range(writers)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads[readers:]:
+            thread.join()
+        write_s = time.perf_counter() - started
+        stop.set()
+        for thread in threads[:readers]:
+            thread.join()
+        scheduler.stop()
+
+        serial = DignitasPageRank(backend=backend)
+        for src, dst, itype, ts in interactions:
+            serial.add_interaction(src, dst, itype, ts)
+        expected = serial.compute_scores()
+        scores = engine.compute_scores()
+        error = max(abs(scores[a] - expected[a]) for a in expected)
+        print(
+            f"{backend}: {writes:,} writes from {writers} threads at {writes / write_s:,.0f}/s, "
+            f"{len(latencies):,} reads (p99 {_percentile(latencies, 99) * 1e6:.0f} us, "
+            f"max {max(latencies) * 1000:.1f} ms) during {scheduler.recompute_count} recomputes "
+            f"(last {scheduler.last_recompute_ms:.0f} ms); "
+            f"inconsistent reads {len(problems)}, max error vs serial {error:.2e}"
+        )
+        ok = (
+            ok
+            and not problems
+            and error < 1e-9
+            and engine.interaction_count == writes
+            and len(scores) == len(expected)
+        )
+    return ok
+
+
+def _hammer(port: int, path: str, seconds: float) -> int:
+    import http.client
+
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    done = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        conn.request("GET", path)
+        conn.getresponse().read()
+        done += 1
+    return done
+
+
+def _wait_ready(port: int, path: str, timeout: float = 60.0):
+    import urllib.request
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as resp:
+                if b'"agents":[{' in resp.read():
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+def bench_workers(workers: int = os.cpu_count() or 1, seconds: float = 5.0, clients: int = 8):
+    """/leaderboard throughput: one process vs. a writer plus read-only workers."""
+    import subprocess
+    from concurrent.futures import ProcessPoolExecutor
+
+    path = "/leaderboard?limit=20"
+    shared = tempfile.mkdtemp(prefix="dignitas-shared-")
+    env = dict(os.environ, SHARED_STATE_DIR=shared)
+    setups = {
+        "single process": [sys.executable, "-m", "uvicorn", "main:app", "--port", "8190"],
+        f"serve.py, {workers} readers": [
+            sys.executable, "serve.py", "--port", "8190", "--writer-port", "8191",
+            "--workers", str(workers),
+        ],
+    }
+    try:
+        for label, command in setups.items():
+            server = subprocess.Popen(
+                command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                _wait_ready(8190, path)
+                with ProcessPoolExecutor(clients) as pool:
+                    counts = list(pool.map(_hammer, [8190] * clients, [path] * clients, [seconds] * clients))
+                print(f"{label}: {sum(counts) / seconds:,.0f} req/s with {clients} clients")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        shutil.rmtree(shared, ignore_errors=True)
+    print(f"({os.cpu_count()} CPUs available)")
+
+
+def bench_offload(num_edges: int = 300_000, seconds: float = 10.0, backend: str = "networkx"):
+    """/health latency while PageRank recomputes, in-process vs. process pool."""
+    import http.client
+    import json
+    import subprocess
+    import threading
+
+    batch = [
+        {"from_agent": src, "to_agent": dst, "interaction_type": itype}
+        for src, dst, itype, _ in _random_interactions(num_edges // 10, num_edges)
+    ]
+    for workers in (0, 1):
+        env = dict(
+            os.environ,
+            PAGERANK_BACKEND=backend,
+            PAGERANK_WORKERS=str(workers),
+            RECOMPUTE_MAX_PENDING_EDGES="1",
+            RECOMPUTE_MIN_STALENESS_S="0",
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", "8193"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_ready(8193, "/leaderboard")
+            conn = http.client.HTTPConnection("127.0.0.1", 8193)
+            for start in range(0, len(batch), 100_000):
+                conn.request(
+                    "POST", "/interactions/batch", json.dumps(batch[start : start + 100_000]),
+                    {"Content-Type": "application/json"},
+                )
+                conn.getresponse().read()
+
+            stop = threading.Event()
+
+            def keep_writing():
+                writer = http.client.HTTPConnection("127.0.0.1", 8193)
+                while not stop.wait(0.05):
+                    writer.request(
+                        "POST", "/interactions", json.dumps(batch[0]),
+                        {"Content-Type": "application/json"},
+                    )
+                    writer.getresponse().read()
+
+            thread = threading.Thread(target=keep_writing)
+            thread.start()
+            latencies = []
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                started = time.perf_counter()
+                conn.request("GET", "/health")
+                conn.getresponse().read()
+                latencies.append(time.perf_counter() - started)
+            stop.set()
+            thread.join()
+            conn.request("GET", "/scores/status")
+            status = json.loads(conn.getresponse().read())
+            print(
+                f"{backend}, PAGERANK_WORKERS={workers}: /health p50 "
+                f"{_percentile(latencies, 50) * 1000:.1f} ms, p99 "
+                f"{_percentile(latencies, 99) * 1000:.1f} ms, max {max(latencies) * 1000:.0f} ms "
+                f"over {status['recompute_count']} recomputes of "
+                f"{status['last_recompute_ms']:.0f} ms"
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_smart(requests: int = 400, concurrency: int = 40):
+    """/discover/smart latency and throughput against the offline stub LLM."""
+    import asyncio
+
+    import httpx
+
+    import main
+    from llm_providers import StubProvider
+
+    main.seed_demo_data()
+    provider = StubProvider(latency_ms=100, jitter_ms=100, error_rate=0.05, seed=1)
+    main.relevancy_engine.provider = provider
+    words = ["travel", "flight", "code", "audit", "data", "crypto", "hotel", "video"]
+
+    async def run(queries):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            slots = asyncio.Semaphore(concurrency)
+            latencies = []
+
+            async def one(query):
+                async with slots:
+                    started = time.perf_counter()
+                    response = await client.post("/discover/smart", json={"query": query})
+                    latencies.append(time.perf_counter() - started)
+                    assert response.status_code == 200, response.text
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(q) for q in queries))
+            return latencies, time.perf_counter() - started
+
+    rng = random.Random(17)
+    ok = True
+    for label, queries in (
+        ("distinct queries", [f"{rng.choice(words)} {i}" for i in range(requests)]),
+        ("repeated queries", [rng.choice(words) for _ in range(requests)]),
+    ):
+        calls = provider.calls
+        latencies, elapsed = asyncio.run(run(queries))
+        print(
+            f"{label}: {requests / elapsed:,.0f} req/s at concurrency {concurrency}, "
+            f"p50 {_percentile(latencies, 50) * 1000:.0f} ms, "
+            f"p99 {_percentile(latencies, 99) * 1000:.0f} ms, "
+            f"{provider.calls - calls} LLM calls"
+        )
+        ok = ok and len(latencies) == requests
+    print(f"relevancy cache: {main.relevancy_engine.cache.stats()}")
+    print(f"coalescing: {main.smart_discover_flights.stats()}")
+
+    # Agents the LLM did not rerank must not outscore those it did
+    agents = [{"address": a} for a in main.relevancy_engine.get_all_specs()]
+    agents = asyncio.run(main.relevancy_engine.compute_relevancy("data", agents))
+    reranked = [a["relevancy_score"] for a in agents if a["relevancy_source"] != "index"]
+    rest = [a["relevancy_score"] for a in agents if a["relevancy_source"] == "index"]
+    if reranked and rest:
+        print(f"lowest reranked score {min(reranked)}, highest index score {max(rest)}")
+        ok = ok and max(rest) <= min(reranked)
+    return ok
+
+
+def bench_records(num_agents: int = 2000, requests: int = 2000):
+    """/leaderboard?limit=100 from pre-serialized records vs. building dicts per request."""
+    import asyncio
+
+    import httpx
+    from fastapi.responses import JSONResponse
+
+    import main
+
+    rng = random.Random(23)
+    words = [f"skill{i}" for i in range(500)]
+    for i in range(num_agents):
+        main.relevancy_engine.register_agent(
+            f"0x{i:040x}",
+            {
+                "name": f"Agent {i}",
+                "description": " ".join(rng.choices(words, k=30)),
+                "capabilities": rng.choices(words, k=6),
+                "tags": rng.choices(words, k=4),
+                "category": rng.choice(["travel", "finance", "code"]),
+            },
+        )
+    main.engine.add_interactions(_random_interactions(num_agents, num_agents * 10, seed=23))
+    main.engine.compute_scores()
+
+    def rebuilt_per_request(limit: int = 10):
+        # How /leaderboard assembled responses before records.py
+        snap = main.current_snapshot()
+        agents = []
+        for addr, score in snap.above(0, limit):
+            agent_data = {"address": addr, "score": round(score, 4)}
+            spec = main.relevancy_engine.get_agent_spec(addr)
+            if spec:
+                for field in ("name", "description", "capabilities", "tags", "category"):
+                    agent_data[field] = spec.get(field)
+                if spec.get("ens_name"):
+                    agent_data["ens_name"] = spec["ens_name"]
+            agents.append(agent_data)
+        return {"agents": agents, "snapshot": snap.info()}
+
+    main.app.get("/bench/leaderboard-dicts", response_class=JSONResponse)(rebuilt_per_request)
+
+    async def run(path):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            body = (await client.get(path)).content
+            started = time.perf_counter()
+            for _ in range(requests):
+                await client.get(path)
+            return requests / (time.perf_counter() - started), body
+
+    results = {}
+    for label, path in (
+        ("dicts + JSONResponse", "/bench/leaderboard-dicts?limit=100"),
+        ("pre-serialized records", "/leaderboard?limit=100"),
+    ):
+        rps, body = asyncio.run(run(path))
+        results[label] = body
+        print(f"{label}: {rps:,.0f} req/s ({len(body):,} bytes)")
+
+    snap = main.current_snapshot()
+    started = time.perf_counter()
+    for _ in range(requests):
+        rebuilt_per_request(100)
+    dicts_us = (time.perf_counter() - started) / requests * 1e6
+    started = time.perf_counter()
+    for _ in range(requests):
+        main.AgentRecords.response(main.agent_records.entries(snap, snap.top(100)), snapshot=snap.info())
+    records_us = (time.perf_counter() - started) / requests * 1e6
+    print(f"response body only: dicts {dicts_us:.0f} us, records {records_us:.0f} us")
+    print(f"records: {main.agent_records.stats()}")
+    old, new = (json.loads(body) for body in results.values())
+    return old["agents"] == new["agents"]
+
+
+def bench_etag(num_agents: int = 20_000, requests: int = 1000):
+    """Polling /scores and /leaderboard: full renders vs. cached bodies vs. 304s."""
+    import asyncio
+
+    import httpx
+
+    import main
+
+    main.engine.add_interactions(_random_interactions(num_agents, num_agents * 5, seed=29))
+    main.engine.compute_scores()
+
+    async def run(path, conditional):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            etag = (await client.get(path)).headers["etag"]
+            headers = {"If-None-Match": etag} if conditional else {}
+            started = time.perf_counter()
+            for _ in range(requests):
+                response = await client.get(path, headers=headers)
+            elapsed = time.perf_counter() - started
+            return requests / elapsed, response.status_code, len(response.content)
+
+    max_entries = main.response_cache.max_entries
+    ok = True
+    for path in ("/scores", "/leaderboard?limit=100"):
+        for label, size, conditional in (
+            ("rendered every time", 0, False),
+            ("cached body", max_entries, False),
+            ("If-None-Match", max_entries, True),
+        ):
+            main.response_cache.max_entries = size
+            rps, status, length = asyncio.run(run(path, conditional))
+            print(f"{path} {label}: {rps:,.0f} req/s ({status}, {length:,} bytes)")
+            ok = ok and status == (304 if conditional else 200)
+    main.response_cache.max_entries = max_entries
+    print(f"response cache: {main.response_cache.stats()}")
+    return ok
+
+
+def bench_personalized(num_agents: int = 20_000, num_edges: int = 200_000, queries: int = 20):
+    """Personalized PageRank by forward push vs. a full personalized power iteration."""
+    engine = DignitasPageRank(backend="sparse")
+    engine.add_interactions(_random_interactions(num_agents, num_edges, seed=11))
+    engine.compute_scores()
+    engine.transition_graph()
+    graph = engine.graph
+
+    rng = random.Random(3)
+    agents = list(graph.nodes)
+    seeds = rng.sample(agents, queries)
+    push_ms, pushes, overlaps, errors = [], [], [], []
+    for seed in seeds:
+        started = time.perf_counter()
+        scores, count = engine.personalized_scores([seed])
+        push_ms.append((time.perf_counter() - started) * 1000)
+        pushes.append(count)
+
+        reference = nx.pagerank(
+            graph, alpha=engine.DAMPING, personalization={seed: 1}, weight="weight", tol=1e-12
+        )
+        top = lambda d: {a for a, _ in sorted(d.items(), key=lambda x: x[1], reverse=True)[:10]}
+        overlaps.append(len(top(scores) & top(reference)) / 10)
+        errors.append(max(abs(scores.get(a, 0.0) - r) for a, r in reference.items()))
+
+    started = time.perf_counter()
+    nx.pagerank(graph, alpha=engine.DAMPING, personalization={seeds[0]: 1}, weight="weight")
+    power_ms = (time.perf_counter() - started) * 1000
+    print(f"{num_agents:,} agents / {num_edges:,} edges, {queries} seeds")
+    print(f"push:  {sum(push_ms) / queries:.1f} ms per query, {sum(pushes) // queries:,} pushes")
+    print(f"nx personalized power iteration: {power_ms:.0f} ms per query")
+    print(f"top-10 overlap {sum(overlaps) / queries:.2f}, max error {max(errors):.1e}")
+    return min(overlaps) >= 0.8
+
+
+def bench_montecarlo(num_agents: int = 5000, num_edges: int = 50000, updates: int = 200):
+    """Stored-walk PageRank: accuracy vs. walks per agent, and incremental updates."""
+    from pagerank import MonteCarloPageRank
+
+    interactions = list(_random_interactions(num_agents, num_edges, seed=17))
+    exact = DignitasPageRank(backend="sparse")
+    exact.add_interactions(interactions)
+    reference = _reference(exact)
+    top = lambda d: {a for a, _ in sorted(d.items(), key=lambda x: x[1], reverse=True)[:100]}
+    ref_top = top(reference)
+
+    def accuracy(scores: dict) -> str:
+        total = sum(scores.values())
+        l1 = sum(abs(scores[a] / total - r) for a, r in reference.items())
+        overlap = len(top(scores) & ref_top) / 100
+        return f"L1 {l1:.3f}, max error {_max_error(scores, reference):.3f}, top-100 overlap {overlap:.2f}"
+
+    print(f"{num_agents:,} agents / {num_edges:,} edges")
+    for walks in (1, 4, 16, 64):
+        engine = MonteCarloPageRank(walks_per_node=walks, seed=1, backend="sparse")
+        started = time.perf_counter()
+        engine.add_interactions(interactions)
+        scores = engine.compute_scores()
+        build_s = time.perf_counter() - started
+        print(f"{walks:>3} walks/agent: build {build_s:.2f} s, {accuracy(scores)}")
+
+    # Single-interaction updates only redraw walks through the changed agent.
+    rng = random.Random(9)
+    agents = list(reference)
+    started = time.perf_counter()
+    resampled = 0
+    for _ in range(updates):
+        src, dst = rng.sample(agents, 2)
+        engine.add_interaction(src, dst, "x402")
+        exact.add_interaction(src, dst, "x402")
+        engine.compute_scores()
+        resampled += engine.last_resampled
+    update_ms = (time.perf_counter() - started) / updates * 1000
+    print(
+        f"update + rescore: {update_ms:.1f} ms, {resampled // updates:,} of "
+        f"{len(engine._walks):,} walks redrawn per interaction"
+    )
+    started = time.perf_counter()
+    exact.compute_scores()
+    print(f"exact full recompute: {(time.perf_counter() - started) * 1000:.0f} ms")
+    reference = _reference(exact)
+    ref_top = top(reference)
+    print(f"after {updates} updates: {accuracy(engine.compute_scores())}")
+    return len(top(engine.compute_scores()) & ref_top) >= 80
+
+
+def bench_stream(subscribers: int = 5000, num_agents: int = 50_000, rounds: int = 8):
+    """Score change fan-out to thousands of subscribers, some of which never read."""
+    import asyncio
+
+    from score_stream import ScoreStream
+
+    engine = DignitasPageRank(backend="sparse")
+    engine.add_interactions(_random_interactions(num_agents, num_agents * 5, seed=31))
+    agents = list(engine.snapshot().ranked_agents)
+    updates = list(_random_interactions(num_agents, rounds * 2000, seed=37))
+    rng = random.Random(5)
+
+    async def run():
+        stream = ScoreStream(None, max_pending=4, max_subscribers=subscribers)
+        await stream.publish(engine.snapshot())
+        readers, stalled = [], []
+        for i in range(subscribers):
+            if i % 10 == 9:
+                stalled.append(stream.subscribe())
+            elif i % 10 == 8:
+                readers.append(stream.subscribe(score_threshold=0, watch=rng.sample(agents, 10)))
+            elif i % 10 == 7:
+                readers.append(stream.subscribe(rank_threshold=100, limit=20))
+            else:
+                readers.append(stream.subscribe())
+        received, latencies, published_at = [0], [], [0.0]
+
+        async def consume(sub):
+            while True:
+                event, _ = await sub.queue.get()
+                if event == "scores":
+                    received[0] += 1
+                    latencies.append(time.perf_counter() - published_at[0])
+
+        tasks = [asyncio.ensure_future(consume(sub)) for sub in readers]
+        await asyncio.sleep(0)
+        for r in range(rounds):
+            engine.add_interactions(updates[r * 2000:(r + 1) * 2000])
+            snap = await asyncio.get_running_loop().run_in_executor(None, engine.snapshot)
+            published_at[0] = time.perf_counter()
+            await stream.publish(snap)
+            while any(not sub.queue.empty() for sub in readers):
+                await asyncio.sleep(0)
+            round_ms = (time.perf_counter() - published_at[0]) * 1000
+            print(
+                f"round {r + 1}: delta {stream.last_delta_ms:.1f} ms, fan-out "
+                f"{stream.last_fanout_ms:.1f} ms ({stream.last_encoded} encoded), "
+                f"all readers served in {round_ms:.1f} ms"
+            )
+        for task in tasks:
+            task.cancel()
+        return stream, readers, stalled, received[0], sorted(latencies)
+
+    stream, readers, stalled, received, latencies = asyncio.run(run())
+    longest_queue = max(sub.queue.qsize() for sub in stalled)
+    print(f"{subscribers:,} subscribers ({len(stalled):,} never read), {num_agents:,} agents")
+    print(
+        f"delivery after publish: p50 {_percentile(latencies, 50) * 1000:.1f} ms, "
+        f"p99 {_percentile(latencies, 99) * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms"
+    )
+    print(
+        f"stalled subscribers: {sum(s.resyncs for s in stalled):,} resyncs, "
+        f"{sum(s.dropped for s in stalled):,} messages dropped, longest queue {longest_queue}"
+    )
+    return received == len(readers) * rounds and longest_queue <= stream.max_pending
+
+
+async def _sse_client(port: int, query: str, ready: "asyncio.Event", seen: list):
+    """Hold one /scores/stream connection, recording when each scores event arrives."""
+    import asyncio
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /scores/stream?{query} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+    buffer = b""
+    try:
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                return
+            buffer += chunk
+            if b"event: ready" in buffer:
+                ready.set()
+            while b"event: scores" in buffer:
+                seen.append(time.perf_counter())
+                buffer = buffer[buffer.index(b"event: scores") + 13:]
+            buffer = buffer[-64:]
+    except asyncio.CancelledError:
+        writer.close()
+
+
+def bench_sse(clients: int = 2000, rounds: int = 3):
+    """End to end: a write reaching thousands of /scores/stream clients of one server."""
+    import asyncio
+    import subprocess
+    import urllib.request
+
+    port = 8192
+    env = dict(os.environ, STREAM_POLL_S="0.05", RECOMPUTE_INTERVAL_S="0.1")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    def write(i: int):
+        body = json.dumps(
+            {"from_agent": f"0x{i:040x}", "to_agent": f"0x{i + 1:040x}", "interaction_type": "x402"}
+        ).encode()
+        req = urllib.request.Request(
+            f"http://127.0.0.1:{port}/interactions", data=body,
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        urllib.request.urlopen(req).read()
+
+    async def run():
+        seen = [[] for _ in range(clients)]
+        events = [asyncio.Event() for _ in range(clients)]
+        started = time.perf_counter()
+        tasks = [
+            asyncio.ensure_future(_sse_client(port, "min_change=0&limit=20", events[i], seen[i]))
+            for i in range(clients)
+        ]
+        await asyncio.wait_for(asyncio.gather(*(e.wait() for e in events)), 120)
+        print(f"{clients:,} clients connected in {time.perf_counter() - started:.1f} s")
+        await asyncio.sleep(0.5)  # Let the stream take its baseline snapshot
+        ok = True
+        for r in range(rounds):
+            written = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(None, write, r)
+            deadline = written + 30
+            while time.perf_counter() < deadline and any(len(s) <= r for s in seen):
+                await asyncio.sleep(0.01)
+            latencies = sorted(s[r] - written for s in seen if len(s) > r)
+            ok = ok and len(latencies) == clients
+            print(
+                f"write {r + 1}: {len(latencies):,}/{clients:,} clients notified, "
+                f"p50 {_percentile(latencies, 50) * 1000:.0f} ms, "
+                f"p99 {_percentile(latencies, 99) * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms"
+            )
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return ok
+
+    try:
+        _wait_ready(port, "/leaderboard?limit=1")
+        ok = asyncio.run(run())
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/scores/stream/status") as resp:
+            print(f"stream status: {json.loads(resp.read())}")
+    finally:
+        server.terminate()
+        server.wait()
+    return ok
+
+
+def bench_pages(num_agents: int = 200_000, page: int = 1000):
+    """/scores and /agents/specs: one full response vs. cursor pages vs. NDJSON."""
+    import asyncio
+
+    import main
+    from records import FastJSONResponse
+
+    main.engine.add_interactions(_random_interactions(num_agents, num_agents * 3, seed=41))
+    main.engine.compute_scores()
+    for i in range(num_agents):
+        main.relevancy_engine.agent_specs[f"0x{i:040x}"] = {
+            "name": f"Agent {i}", "description": "Benchmark agent", "capabilities": ["x"],
+            "tags": ["bench"], "category": "general", "ens_name": None,
+        }
+    main.relevancy_engine.specs_version += 1
+
+    def measure(fn):
+        """Result, milliseconds, and peak MiB allocated (from a second, traced run)."""
+        started = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, elapsed, peak / 2**20
+
+    async def drain(response):
+        first, size = None, 0
+        started = time.perf_counter()
+        async for chunk in response.body_iterator:
+            first = first or (time.perf_counter() - started) * 1000
+            size += len(chunk)
+        return first, size
+
+    def walk(endpoint, **params):
+        rows, pages, cursor = [], 0, None
+        while True:
+            result = endpoint(limit=page, cursor=cursor, **params)
+            FastJSONResponse(result)
+            rows += [row["address"] for row in result["agents"]]
+            pages += 1
+            cursor = result["next_cursor"]
+            if cursor is None:
+                return rows, pages
+
+    ok = True
+    for name, endpoint, order in (
+        ("/scores", main.get_all_scores, "score"),
+        ("/agents/specs", main.get_all_agent_specs, "address"),
+    ):
+        kwargs = dict(limit=None, cursor=None, order=None, fields=None, format=None)
+        body, full_ms, full_mb = measure(lambda: FastJSONResponse(endpoint(**kwargs)).body)
+        print(f"{name} full: {full_ms:.0f} ms, {len(body) / 2**20:.1f} MiB, peak {full_mb:.0f} MiB")
+
+        page_kwargs = dict(kwargs, limit=page, order=order)
+        endpoint(**page_kwargs)  # Builds the ordering once per snapshot
+        _, page_ms, page_mb = measure(lambda: FastJSONResponse(endpoint(**page_kwargs)).body)
+        print(f"{name} first page of {page}: {page_ms:.1f} ms, peak {page_mb:.1f} MiB")
+
+        started = time.perf_counter()
+        rows, pages = walk(endpoint, order=order, fields=None, format=None)
+        walk_ms = (time.perf_counter() - started) * 1000
+        print(f"{name} all {pages} pages by cursor: {walk_ms:.0f} ms")
+        ok = ok and len(rows) == len(set(rows)) == (
+            len(main.current_snapshot().scores) if name == "/scores" else num_agents
+        )
+
+        stream_kwargs = dict(kwargs, format="ndjson")
+        (first_ms, size), stream_ms, stream_mb = measure(
+            lambda: asyncio.run(drain(endpoint(**stream_kwargs)))
+        )
+        print(
+            f"{name} NDJSON: first chunk {first_ms:.1f} ms, all {stream_ms:.0f} ms, "
+            f"{size / 2**20:.1f} MiB, peak {stream_mb:.1f} MiB"
+        )
+        ok = ok and stream_mb < full_mb
+    return ok
+
+
+BENCHMARKS = {
+    "incremental": bench_incremental,
+    "backends": bench_backends,
+    "decay": bench_decay,
+    "batch": bench_batch_ingest,
+    "durability": bench_durability,
+    "mmap": bench_mmap,
+    "ranking": bench_ranking,
+    "prefilter": bench_prefilter,
+    "filter": bench_filter,
+    "retrieval": bench_retrieval,
+    "smart": bench_smart,
+    "records": bench_records,
+    "etag": bench_etag,
+    "pages": bench_pages,
+    "stream": bench_stream,
+    "sse": bench_sse,
+    "concurrency": bench_concurrency,
+    "workers": bench_workers,
+    "offload": bench_offload,
+    "personalized": bench_personalized,
+    "montecarlo": bench_montecarlo,
+}
+
+
+if __name__ == "__main__":
+    # `python benchmark.py [name [size]] ...`; a number after a name is
+    # passed as that benchmark's first argument.
+    runs = []
+    for arg in sys.argv[1:]:
+        if arg.isdigit() and runs:
+            runs[-1][1].append(int(arg))
+        else:
+            runs.append((arg, []))
+    ok = True
+    for name, args in runs or [(name, []) for name in BENCHMARKS]:
+        print(f"== {name} ==")
+        ok = BENCHMARKS[name](*args) is not False and ok
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,564 @@
+import fcntl
+import os
+from array import array
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (from, to, weight, interaction type, timestamp) as passed to add_edges
+EdgeRow = Tuple[str, str, float, str, datetime]
+
+
+class NetworkXGraphStore:
+    """Interaction graph kept as an `nx.DiGraph` with a weight per edge.
+
+    The same edges are mirrored into a COO table (typed arrays, with the
+    edge's position kept in its data as `pos`), so `adjacency()` is a
+    numpy conversion rather than a walk over the graph's dicts.
+    """
+
+    name = "networkx"
+    local_updates = True  # row() is cheap enough for forward push
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.graph = nx.DiGraph()
+        self._index: Dict[str, int] = {}
+        self._nodes: List[str] = []
+        self._src = array("i")
+        self._dst = array("i")
+        self._weight = array("d")
+
+    def __len__(self) -> int:
+        return len(self.graph)
+
+    def __contains__(self, agent: str) -> bool:
+        return agent in self.graph
+
+    def nodes(self) -> List[str]:
+        return list(self.graph)
+
+    def add_edge(
+        self,
+        from_agent: str,
+        to_agent: str,
+        weight: float,
+        interaction_type: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ):
+        """Add weight to an edge, creating it if needed."""
+        data = self.graph.get_edge_data(from_agent, to_agent)
+        if data is not None:
+            data['weight'] += weight
+            self._weight[data['pos']] += weight
+        else:
+            pos = self._append(self._node_id(from_agent), self._node_id(to_agent), weight)
+            self.graph.add_edge(from_agent, to_agent, weight=weight, pos=pos)
+
+    def _node_id(self, agent: str) -> int:
+        idx = self._index.get(agent)
+        if idx is None:
+            idx = len(self._nodes)
+            self._index[agent] = idx
+            self._nodes.append(agent)
+        return idx
+
+    def _append(self, src: int, dst: int, weight: float) -> int:
+        """Add a row to the COO table; returns its position."""
+        self._src.append(src)
+        self._dst.append(dst)
+        self._weight.append(weight)
+        return len(self._weight) - 1
+
+    def add_edges(self, rows: Iterable[EdgeRow]):
+        """Add many interactions, touching each distinct edge once."""
+        edges: Dict[Tuple[str, str], float] = {}
+        for from_agent, to_agent, weight, _, _ in rows:
+            key = (from_agent, to_agent)
+            edges[key] = edges.get(key, 0) + weight
+        for (from_agent, to_agent), weight in edges.items():
+            self.add_edge(from_agent, to_agent, weight)
+
+    def load(self, nodes: List[str], src: np.ndarray, dst: np.ndarray, weight: np.ndarray):
+        """Add an edge table given as node indices into `nodes`."""
+        src, dst = src.tolist(), dst.tolist()
+        weight = np.asarray(weight, dtype=np.float64).tolist()
+        if len(self.graph):
+            for i, j, w in zip(src, dst, weight):
+                self.add_edge(nodes[i], nodes[j], w)
+            return
+        # Into an empty store (a restore): the table becomes the COO
+        # table as is, assuming one row per edge as export_state gives.
+        for node in nodes:
+            self._node_id(node)
+        for i, j, w in zip(src, dst, weight):
+            self._append(i, j, w)
+        self.graph.add_nodes_from(nodes)
+        self.graph.add_edges_from(
+            (nodes[i], nodes[j], {'weight': w, 'pos': k})
+            for k, (i, j, w) in enumerate(zip(src, dst, weight))
+        )
+
+    def compact(self):
+        """No-op; edges are updated in place."""
+
+    def scale(self, factor: float):
+        """Multiply every edge weight by `factor`."""
+        for _, _, data in self.graph.edges(data=True):
+            data['weight'] *= factor
+        if self._weight:
+            np.frombuffer(self._weight, dtype=np.float64)[:] *= factor
+
+    def row(self, agent: str) -> Dict[str, float]:
+        """Out-edges of `agent` as {target: weight}."""
+        if agent not in self.graph:
+            return {}
+        return {v: d['weight'] for v, d in self.graph[agent].items()}
+
+    def adjacency(self) -> Tuple[List[str], sp.csr_array]:
+        """Node list and weighted adjacency matrix in that node order."""
+        n = len(self._nodes)
+        src = np.frombuffer(self._src, dtype=np.int32) if self._src else np.empty(0, np.int32)
+        dst = np.frombuffer(self._dst, dtype=np.int32) if self._dst else np.empty(0, np.int32)
+        weight = np.array(self._weight, dtype=np.float64)
+        matrix = sp.csr_array((weight, (src, dst)), shape=(n, n))
+        return list(self._nodes), matrix
+
+    def to_networkx(self) -> nx.DiGraph:
+        return self.graph
+
+
+class SparseGraphStore:
+    """Interaction graph as an integer-indexed node table plus CSR arrays.
+
+    New interactions are appended to a COO buffer (three flat lists) and
+    folded into the CSR arrays, summing duplicate edges, when the buffer
+    fills up or the matrix is needed. Costs ~12 bytes per stored edge
+    instead of a Python dict per edge.
+    """
+
+    name = "sparse"
+    local_updates = True
+    COMPACT_THRESHOLD = 100_000
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._index: Dict[str, int] = {}
+        self._nodes: List[str] = []
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.empty(0, dtype=np.int32)
+        self._data = np.empty(0, dtype=np.float64)
+        self._buf_src: List[int] = []
+        self._buf_dst: List[int] = []
+        self._buf_weight: List[float] = []
+        self._buffered_sources = set()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, agent: str) -> bool:
+        return agent in self._index
+
+    def nodes(self) -> List[str]:
+        return list(self._nodes)
+
+    def _node_id(self, agent: str) -> int:
+        idx = self._index.get(agent)
+        if idx is None:
+            idx = len(self._nodes)
+            self._index[agent] = idx
+            self._nodes.append(agent)
+        return idx
+
+    def add_edge(
+        self,
+        from_agent: str,
+        to_agent: str,
+        weight: float,
+        interaction_type: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ):
+        """Buffer weight for an edge; duplicates are summed on compaction."""
+        src = self._node_id(from_agent)
+        dst = self._node_id(to_agent)
+        self._buf_src.append(src)
+        self._buf_dst.append(dst)
+        self._buf_weight.append(weight)
+        self._buffered_sources.add(src)
+        if len(self._buf_src) >= self.COMPACT_THRESHOLD:
+            self.compact()
+
+    def add_edges(self, rows: Iterable[EdgeRow]):
+        """Buffer many interactions, compacting at most once."""
+        node_id = self._node_id
+        for from_agent, to_agent, weight, _, _ in rows:
+            src = node_id(from_agent)
+            self._buf_src.append(src)
+            self._buf_dst.append(node_id(to_agent))
+            self._buf_weight.append(weight)
+            self._buffered_sources.add(src)
+        if len(self._buf_src) >= self.COMPACT_THRESHOLD:
+            self.compact()
+
+    def load(self, nodes: List[str], src: np.ndarray, dst: np.ndarray, weight: np.ndarray):
+        """Add an edge table given as node indices into `nodes`."""
+        ids = np.fromiter((self._node_id(n) for n in nodes), dtype=np.int32, count=len(nodes))
+        self.compact()
+        self._merge(ids[src], ids[dst], np.asarray(weight, dtype=np.float64))
+
+    def _csr(self) -> sp.csr_array:
+        n = len(self._nodes)
+        indptr = self._indptr
+        if len(indptr) < n + 1:
+            # Rows for nodes added since the last compaction are empty.
+            indptr = np.concatenate(
+                [indptr, np.full(n + 1 - len(indptr), indptr[-1], dtype=np.int64)]
+            )
+        return sp.csr_array((self._data, self._indices, indptr), shape=(n, n))
+
+    def compact(self):
+        """Merge the COO append buffer into the CSR arrays."""
+        if not self._buf_src and len(self._indptr) == len(self._nodes) + 1:
+            return
+        self._merge(
+            np.asarray(self._buf_src, dtype=np.int32),
+            np.asarray(self._buf_dst, dtype=np.int32),
+            np.asarray(self._buf_weight, dtype=np.float64),
+        )
+        self._buf_src, self._buf_dst, self._buf_weight = [], [], []
+        self._buffered_sources = set()
+
+    def _merge(self, src: np.ndarray, dst: np.ndarray, weight: np.ndarray):
+        """Add COO edge arrays into the CSR arrays, summing duplicates."""
+        matrix = self._csr()
+        if len(src):
+            n = len(self._nodes)
+            added = sp.coo_array((weight, (src, dst)), shape=(n, n)).tocsr()
+            matrix = (matrix + added).tocsr()
+            matrix.sum_duplicates()
+        self._indptr = matrix.indptr.astype(np.int64)
+        self._indices = matrix.indices.astype(np.int32)
+        self._data = matrix.data
+
+    def scale(self, factor: float):
+        """Multiply every edge weight by `factor`."""
+        self._data = self._data * factor
+        self._buf_weight = [w * factor for w in self._buf_weight]
+
+    def row(self, agent: str) -> Dict[str, float]:
+        """Out-edges of `agent` as {target: weight}, including buffered ones."""
+        idx = self._index.get(agent)
+        if idx is None:
+            return {}
+        result: Dict[str, float] = {}
+        if idx + 1 < len(self._indptr):
+            start, end = self._indptr[idx], self._indptr[idx + 1]
+            for dst, w in zip(self._indices[start:end], self._data[start:end]):
+                result[self._nodes[dst]] = float(w)
+        if idx in self._buffered_sources:
+            for src, dst, w in zip(self._buf_src, self._buf_dst, self._buf_weight):
+                if src == idx:
+                    target = self._nodes[dst]
+                    result[target] = result.get(target, 0) + w
+        return result
+
+    def adjacency(self) -> Tuple[List[str], sp.csr_array]:
+        """Node list and weighted adjacency matrix in that node order."""
+        self.compact()
+        return self.nodes(), self._csr()
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Materialize as an `nx.DiGraph` (for tooling, not the hot path)."""
+        nodes, matrix = self.adjacency()
+        graph = nx.DiGraph()
+        graph.add_nodes_from(nodes)
+        coo = matrix.tocoo()
+        graph.add_weighted_edges_from(
+            (nodes[i], nodes[j], float(w)) for i, j, w in zip(coo.row, coo.col, coo.data)
+        )
+        return graph
+
+
+class MemmapEdgeStore:
+    """Columnar on-disk edge table accessed through `numpy.memmap`.
+
+    One row per interaction (source index, target index, weight, type
+    code, unix timestamp), each column in its own file under `path`.
+    PageRank streams over the columns in chunks via `out_weight()` and
+    `propagate()`, so the edge table never becomes Python objects and
+    need not fit in RAM. Processes opening the same directory with
+    `readonly=True` map the same files and share the page cache with
+    the writer; `refresh()` picks up rows appended since.
+
+    Only one process may open a directory writable, and an existing
+    table is only discarded when asked for with `truncate=True`.
+    """
+
+    name = "mmap"
+    local_updates = False  # row() scans the whole table
+    CHUNK_EDGES = 1 << 20
+    INITIAL_CAPACITY = 1 << 16
+    COLUMNS = {
+        "src": np.int32,
+        "dst": np.int32,
+        "weight": np.float64,
+        "type": np.uint8,
+        "timestamp": np.float64,
+    }
+    TYPE_CODES = {"x402": 0, "feedback": 1, "negative_feedback": 2}
+    UNKNOWN_TYPE = 255
+
+    def __init__(self, path: Optional[str] = None, readonly: bool = False, truncate: bool = False):
+        self.path = path or os.getenv("EDGE_STORE_DIR", "edge_store")
+        self.readonly = readonly
+        self._columns: Dict[str, np.memmap] = {}
+        self._index: Dict[str, int] = {}
+        self._nodes: List[str] = []
+        self._nodes_offset = 0
+        self._count = 0  # Rows visible to a read-only store, as of refresh()
+        if readonly:
+            self._header = np.memmap(self._file("header"), dtype=np.int64, mode="r", shape=(2,))
+            self.refresh()
+            return
+        os.makedirs(self.path, exist_ok=True)
+        self._lock_file = open(os.path.join(self.path, "lock"), "wb")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(f"Edge store {self.path!r} is open for writing in another process")
+        header = self._file("header")
+        if not truncate and os.path.exists(header) and os.path.getsize(header) >= 16:
+            if np.fromfile(header, dtype=np.int64, count=1)[0] > 0:
+                self._lock_file.close()
+                raise FileExistsError(
+                    f"Edge store {self.path!r} already holds rows; open it with "
+                    "truncate=True to discard them, or readonly=True to read them"
+                )
+        self.clear()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.bin" if name != "nodes" else "nodes.txt")
+
+    @property
+    def count(self) -> int:
+        """Number of interaction rows written (as of refresh() when read-only)."""
+        if self.readonly:
+            return self._count
+        return int(self._header[0])
+
+    def clear(self):
+        """Truncate the store to an empty table."""
+        self._columns = {}
+        for name in self.COLUMNS:
+            with open(self._file(name), "wb"):
+                pass
+        with open(self._file("nodes"), "wb"):
+            pass
+        self._header = np.memmap(self._file("header"), dtype=np.int64, mode="w+", shape=(2,))
+        self._index = {}
+        self._nodes = []
+        self._remap(self.INITIAL_CAPACITY)
+
+    def _remap(self, capacity: int):
+        """Grow the column files to `capacity` rows and map them."""
+        for name, dtype in self.COLUMNS.items():
+            column = self._columns.pop(name, None)
+            if column is not None:
+                column.flush()
+                del column
+            with open(self._file(name), "r+b") as f:
+                f.truncate(capacity * np.dtype(dtype).itemsize)
+            self._columns[name] = np.memmap(
+                self._file(name), dtype=dtype, mode="r+", shape=(capacity,)
+            )
+        self._header[1] = capacity
+
+    def refresh(self):
+        """Re-read the node table and row count written by another process."""
+        # Count first: the writer adds node names before rows that use
+        # them, so every row below the count has its nodes in the file.
+        self._count = int(self._header[0])
+        with open(self._file("nodes"), "rb") as f:
+            f.seek(self._nodes_offset)
+            tail = f.read()
+        complete = tail.rfind(b"\n") + 1
+        for name in tail[:complete].decode().splitlines():
+            self._index[name] = len(self._nodes)
+            self._nodes.append(name)
+        self._nodes_offset += complete
+
+        capacity = int(self._header[1])
+        if not self._columns or len(self._columns["src"]) != capacity:
+            self._columns = {
+                name: np.memmap(self._file(name), dtype=dtype, mode="r", shape=(capacity,))
+                for name, dtype in self.COLUMNS.items()
+            }
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, agent: str) -> bool:
+        return agent in self._index
+
+    def nodes(self) -> List[str]:
+        return list(self._nodes)
+
+    def _node_ids(self, agents: List[str]) -> np.ndarray:
+        new = []
+        ids = np.empty(len(agents), dtype=np.int32)
+        for i, agent in enumerate(agents):
+            idx = self._index.get(agent)
+            if idx is None:
+                idx = len(self._nodes)
+                self._index[agent] = idx
+                self._nodes.append(agent)
+                new.append(agent)
+            ids[i] = idx
+        if new:
+            # Names hit the file before any row refers to them.
+            with open(self._file("nodes"), "ab") as f:
+                f.write(("\n".join(new) + "\n").encode())
+        return ids
+
+    def _append(self, src: np.ndarray, dst: np.ndarray, weight, kinds, timestamps):
+        start = self.count
+        end = start + len(src)
+        capacity = int(self._header[1])
+        if end > capacity:
+            self._remap(max(capacity * 2, end))
+        cols = self._columns
+        cols["src"][start:end] = src
+        cols["dst"][start:end] = dst
+        cols["weight"][start:end] = weight
+        cols["type"][start:end] = kinds
+        cols["timestamp"][start:end] = timestamps
+        # Publish the rows only after they are written.
+        self._header[0] = end
+
+    def add_edge(
+        self,
+        from_agent: str,
+        to_agent: str,
+        weight: float,
+        interaction_type: Optional[str] = None,
+        timestamp: Optional[datetime] = None,
+    ):
+        """Append one interaction row."""
+        self.add_edges([(from_agent, to_agent, weight, interaction_type, timestamp)])
+
+    def add_edges(self, rows: Iterable[EdgeRow]):
+        """Append one row per interaction."""
+        rows = list(rows)
+        if not rows:
+            return
+        ids = self._node_ids([a for row in rows for a in row[:2]])
+        epoch = datetime(1970, 1, 1)
+        self._append(
+            ids[0::2],
+            ids[1::2],
+            [row[2] for row in rows],
+            [self.TYPE_CODES.get(row[3], self.UNKNOWN_TYPE) for row in rows],
+            [(row[4] - epoch).total_seconds() if row[4] else np.nan for row in rows],
+        )
+
+    def load(self, nodes: List[str], src: np.ndarray, dst: np.ndarray, weight: np.ndarray):
+        """Append an edge table given as node indices into `nodes`."""
+        ids = self._node_ids(nodes)
+        n = len(src)
+        self._append(
+            ids[src], ids[dst], weight,
+            np.full(n, self.UNKNOWN_TYPE, dtype=np.uint8), np.full(n, np.nan),
+        )
+
+    def chunks(self) -> Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """(src, dst, weight) views over the table, CHUNK_EDGES rows at a time."""
+        count = self.count
+        cols = self._columns
+        for start in range(0, count, self.CHUNK_EDGES):
+            end = min(start + self.CHUNK_EDGES, count)
+            yield cols["src"][start:end], cols["dst"][start:end], cols["weight"][start:end]
+
+    def out_weight(self) -> np.ndarray:
+        """Total out-edge weight per node index."""
+        n = len(self._nodes)
+        total = np.zeros(n)
+        for src, _, weight in self.chunks():
+            total += np.bincount(src, weights=weight, minlength=n)
+        return total
+
+    def propagate(self, x: np.ndarray) -> np.ndarray:
+        """y[v] = sum of weight(u, v) * x[u] over all edges, streamed."""
+        n = len(self._nodes)
+        y = np.zeros(n)
+        for src, dst, weight in self.chunks():
+            y += np.bincount(dst, weights=weight * x[src], minlength=n)
+        return y
+
+    def compact(self):
+        """Flush dirty pages to disk."""
+        if not self.readonly:
+            for column in self._columns.values():
+                column.flush()
+
+    def scale(self, factor: float):
+        """Multiply every edge weight by `factor`, in place."""
+        for _, _, weight in self.chunks():
+            weight *= factor
+
+    def row(self, agent: str) -> Dict[str, float]:
+        """Out-edges of `agent` as {target: weight}; scans every chunk."""
+        idx = self._index.get(agent)
+        result: Dict[str, float] = {}
+        if idx is None:
+            return result
+        for src, dst, weight in self.chunks():
+            hits = np.nonzero(src == idx)[0]
+            for j, w in zip(dst[hits], weight[hits]):
+                target = self._nodes[j]
+                result[target] = result.get(target, 0) + float(w)
+        return result
+
+    def adjacency(self) -> Tuple[List[str], sp.csr_array]:
+        """Node list and summed adjacency matrix (materialized in RAM)."""
+        n = len(self._nodes)
+        matrix = sp.csr_array((n, n))
+        for src, dst, weight in self.chunks():
+            matrix = matrix + sp.coo_array((weight, (src, dst)), shape=(n, n)).tocsr()
+        matrix.sum_duplicates()
+        return self.nodes(), matrix.tocsr()
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Materialize as an `nx.DiGraph` (for tooling, not the hot path)."""
+        nodes, matrix = self.adjacency()
+        graph = nx.DiGraph()
+        graph.add_nodes_from(nodes)
+        coo = matrix.tocoo()
+        graph.add_weighted_edges_from(
+            (nodes[i], nodes[j], float(w)) for i, j, w in zip(coo.row, coo.col, coo.data)
+        )
+        return graph
+
+
+BACKENDS = {
+    NetworkXGraphStore.name: NetworkXGraphStore,
+    SparseGraphStore.name: SparseGraphStore,
+    MemmapEdgeStore.name: MemmapEdgeStore,
+}
+
+
+def make_store(backend: str, **options):
+    """Instantiate a graph store by backend name."""
+    try:
+        store_cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown PageRank backend {backend!r}; expected one of {sorted(BACKENDS)}"
+        )
+    return store_cls(**options)
@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+from typing import Dict, List, Optional
+
+
+class GeminiProvider:
+    """Relevancy scores from a Gemini model."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model: str = "gemini-2.5-flash"):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model)
+
+    async def score(self, query: str, agents_info: List[dict]) -> Dict[str, float]:
+        """Ask the model for relevancy scores of `agents_info`, keyed by address."""
+        prompt = f"""You are an AI agent matchmaker. Given a user's request and a list of AI agents with their specifications, rate how relevant each agent is to the request.
+
+USER REQUEST: "{query}"
+
+AGENTS:
+{json.dumps(agents_info, indent=2)}
+
+For each agent, provide a relevancy score from 0.0 to 1.0 where:
+- 1.0 = Perfect match, agent is exactly what the user needs
+- 0.7-0.9 = Good match, agent can likely help
+- 0.4-0.6 = Partial match, some overlap
+- 0.1-0.3 = Weak match, minimal relevance
+- 0.0 = No relevance at all
+
+Respond ONLY with a JSON object mapping agent addresses to their relevancy scores.
+Example: {{"0x1234...": 0.85, "0x5678...": 0.3}}
+"""
+
+        response = await self.model.generate_content_async(prompt)
+        text = response.text.strip()
+
+        # Extract JSON from response
+        if "```json" in text:
+            text = text.split("```json")[1].split("```")[0]
+        elif "```" in text:
+            text = text.split("```")[1].split("```")[0]
+
+        scores = json.loads(text)
+        return {
+            addr: float(score)
+            for addr, score in scores.items()
+            if isinstance(score, (int, float))
+        }
+
+
+class StubProvider:
+    """Offline stand-in for an LLM, for benchmarks and load tests.
+
+    Each call sleeps `latency_ms` (plus up to `jitter_ms`) and fails
+    with probability `error_rate`. Scores are a hash of (query, address),
+    or `fixed_score` if given, so runs are reproducible.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        fixed_score: Optional[float] = None,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.fixed_score = fixed_score
+        self._rng = random.Random(seed)
+        self.calls = 0
+
+    def _score(self, query: str, address: str) -> float:
+        if self.fixed_score is not None:
+            return self.fixed_score
+        digest = hashlib.blake2b(f"{query}\0{address}".encode(), digest_size=8).digest()
+        return round(int.from_bytes(digest, "big") / 2**64, 4)
+
+    async def score(self, query: str, agents_info: List[dict]) -> Dict[str, float]:
+        self.calls += 1
+        delay = self.latency_ms + self._rng.random() * self.jitter_ms
+        failed = self._rng.random() < self.error_rate
+        await asyncio.sleep(delay / 1000)
+        if failed:
+            raise RuntimeError("stub provider error")
+        return {agent["address"]: self._score(query, agent["address"]) for agent in agents_info}
+
+
+PROVIDERS = {
+    GeminiProvider.name: GeminiProvider,
+    StubProvider.name: StubProvider,
+}
+
+
+def make_provider(name: str, **options):
+    """Instantiate an LLM provider by name."""
+    try:
+        return PROVIDERS[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown LLM provider {name!r}; expected one of {sorted(PROVIDERS)}")
+
+
+def provider_from_env():
+    """LLM provider selected by LLM_PROVIDER, or None to use the local index only.
+
+    Defaults to Gemini when GEMINI_API_KEY is set.
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    name = os.getenv("LLM_PROVIDER", "gemini" if api_key else "none")
+    if name == "none":
+        return None
+    if name == GeminiProvider.name:
+        if not api_key:
+            raise ValueError("LLM_PROVIDER=gemini requires GEMINI_API_KEY")
+        return make_provider(name, api_key=api_key)
+    if name == StubProvider.name:
+        fixed = os.getenv("STUB_LLM_SCORE")
+        return make_provider(
+            name,
+            latency_ms=float(os.getenv("STUB_LLM_LATENCY_MS", "200")),
+            jitter_ms=float(os.getenv("STUB_LLM_JITTER_MS", "0")),
+            error_rate=float(os.getenv("STUB_LLM_ERROR_RATE", "0")),
+            fixed_score=float(fixed) if fixed else None,
+            seed=int(os.getenv("STUB_LLM_SEED", "0")),
+        )
+    return make_provider(name)
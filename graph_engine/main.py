@@ -1,31 +1,122 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Optional, List, Tuple
 from datetime import datetime, timedelta
+import asyncio
+import heapq
+import json
+import os
 import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
 
-from pagerank import DignitasPageRank
+from pagerank import DignitasPageRank, MonteCarloPageRank
+from pagination import ORDERS, SCORE_ROW_FIELDS, SPEC_ROW_FIELDS, Listings, decode_cursor
+from pagination import ndjson, parse_fields, rows, scores_listing, specs_listing
+from records import AgentRecords, FastJSONResponse
+from response_cache import ResponseCache, etag_matches
 from relevancy import RelevancyEngine
+from relevancy_cache import normalize_query
+from scheduler import RecomputeScheduler
+from score_stream import ScoreStream
+from shared_state import SnapshotPublisher, SnapshotSubscriber
+from singleflight import SingleFlight
+from storage import Persistence
 
-app = FastAPI(title="Dignitas Graph Engine")
+app = FastAPI(title="Dignitas Graph Engine", default_response_class=FastJSONResponse)
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=False,  # Must be False when allow_origins is "*"
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-)
+BATCH_MAX_INTERACTIONS = int(os.getenv("BATCH_MAX_INTERACTIONS", "100000"))
+BATCH_MAX_ERRORS = 100  # Rejected records reported back in detail
+DISCOVER_MAX_DEPTH = int(os.getenv("DISCOVER_MAX_DEPTH", "1000"))
 
-engine = DignitasPageRank()
+# Multi-worker mode: one "writer" process owns the graph and publishes
+# snapshots and specs; any number of "reader" processes serve from them
+# and forward writes to WRITER_URL. "standalone" does both in-process.
+WORKER_ROLE = os.getenv("WORKER_ROLE", "standalone")
+
+PAGERANK_WALKS = int(os.getenv("PAGERANK_WALKS", "0"))
+PAGERANK_BACKEND = os.getenv("PAGERANK_BACKEND", "networkx")
+# The graph is rebuilt from persisted state on startup, so a previous
+# run's on-disk edge table is discarded.
+store_options = {"truncate": True} if PAGERANK_BACKEND == "mmap" else {}
+if WORKER_ROLE == "reader":
+    # Readers never hold the graph; an empty in-memory engine keeps them
+    # off the writer's edge store (EDGE_STORE_DIR) and process pool.
+    engine = DignitasPageRank()
+elif PAGERANK_WALKS:
+    engine = MonteCarloPageRank(
+        walks_per_node=PAGERANK_WALKS, backend=PAGERANK_BACKEND, **store_options
+    )
+else:
+    engine = DignitasPageRank(
+        incremental=os.getenv("PAGERANK_INCREMENTAL", "false").lower() in ("1", "true", "yes"),
+        backend=PAGERANK_BACKEND,
+        workers=int(os.getenv("PAGERANK_WORKERS", "0")),
+        **store_options,
+    )
 relevancy_engine = RelevancyEngine()
+scheduler = RecomputeScheduler.from_env(engine)
+persistence = Persistence.from_env(engine, relevancy_engine)
+smart_discover_flights = SingleFlight()
+agent_records = AgentRecords(relevancy_engine)
+
+WRITER_URL = os.getenv("WRITER_URL", "http://127.0.0.1:8001")
+WRITE_PATHS = {"/interactions", "/interactions/batch", "/agents/register"}
+GRAPH_QUERY_PREFIX = "/scores/personalized/"  # Needs the graph, which readers lack
+publisher = (
+    SnapshotPublisher.from_env(engine, relevancy_engine) if WORKER_ROLE == "writer" else None
+)
+subscriber = SnapshotSubscriber.from_env(relevancy_engine) if WORKER_ROLE == "reader" else None
+
+# HTTP caching for GETs that depend only on the score snapshot and/or
+# the agent specs: (uses scores, uses specs) per path.
+CACHEABLE_PATHS = {
+    "/scores": (True, False),
+    "/leaderboard": (True, True),
+    "/discover": (True, True),
+    "/agents/specs": (False, True),
+}
+RESPONSE_MAX_AGE_S = int(os.getenv("RESPONSE_MAX_AGE_S", "0"))
+response_cache = ResponseCache(int(os.getenv("RESPONSE_CACHE_SIZE", "256")))
+BOOT_ID = publisher.boot_id if publisher is not None else os.urandom(4).hex()
+
+# Cursor pagination of /scores and /agents/specs
+PAGE_DEFAULT_LIMIT = 1000
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "10000"))
+listings = Listings()
+
+
+def current_snapshot():
+    """Score snapshot to serve reads from."""
+    if subscriber is not None:
+        return subscriber.snapshot()
+    return scheduler.snapshot()
+
+
+async def current_snapshot_async():
+    """current_snapshot() for async endpoints; never recomputes on the event loop."""
+    if subscriber is not None or scheduler.running:
+        return current_snapshot()
+    return await run_in_threadpool(scheduler.snapshot)
+
+
+# Score change streams (/scores/stream, /scores/ws), fed from the
+# snapshots this process serves.
+STREAM_HEARTBEAT_S = 15.0
+score_stream = ScoreStream(
+    current_snapshot_async,
+    interval_s=float(os.getenv("STREAM_POLL_S", "0.5")),
+    max_pending=int(os.getenv("STREAM_MAX_PENDING", "16")),
+    max_subscribers=int(os.getenv("STREAM_MAX_SUBSCRIBERS", "10000")),
+)
 
 
 # --- Seed with demo data on startup ---
-@app.on_event("startup")
 def seed_demo_data():
     """Create realistic demo graph with deterministic data."""
     random.seed(42)  # Fixed seed for reproducible scores
@@ -739,6 +830,153 @@ def seed_demo_data():
     print(f"Registered {len(agent_specs)} agent specifications")
 
 
+@app.on_event("startup")
+def restore_state():
+    """Recover persisted state, or seed demo data on first start."""
+    if subscriber is not None:
+        return  # Readers get their state from the writer
+    if not persistence.recover():
+        seed_demo_data()
+        persistence.snapshot()
+    persistence.start()
+
+
+@app.on_event("startup")
+def start_recompute_scheduler():
+    """Start background PageRank recomputation unless disabled."""
+    if subscriber is not None:
+        return
+    if publisher is not None or os.getenv("RECOMPUTE_BACKGROUND", "true").lower() in (
+        "1",
+        "true",
+        "yes",
+    ):
+        scheduler.start()
+
+
+@app.on_event("startup")
+def start_shared_state():
+    """Start publishing (writer) or following (reader) shared state."""
+    if publisher is not None:
+        publisher.start()
+    if subscriber is not None:
+        subscriber.start()
+
+
+@app.on_event("startup")
+async def start_score_stream():
+    score_stream.start()
+
+
+@app.on_event("shutdown")
+def stop_recompute_scheduler():
+    score_stream.stop()
+    if publisher is not None:
+        publisher.stop()
+    if subscriber is not None:
+        subscriber.stop()
+    scheduler.stop()
+    persistence.close()
+    engine.close()
+
+
+def _forward_to_writer(
+    method: str, path: str, body: Optional[bytes] = None, content_type: str = "application/json"
+) -> Tuple[int, bytes, str]:
+    """Send a request to the writer process; returns status, body and content type."""
+    req = urllib.request.Request(
+        WRITER_URL + path, data=body, headers={"Content-Type": content_type}, method=method
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return resp.status, resp.read(), resp.headers.get("Content-Type", "")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read(), e.headers.get("Content-Type", "")
+    except urllib.error.URLError as e:
+        detail = json.dumps({"detail": f"Writer unavailable: {e.reason}"}).encode()
+        return 503, detail, "application/json"
+
+
+@app.middleware("http")
+async def forward_writes_to_writer(request: Request, call_next):
+    """Read-only workers hand writes, and queries needing the graph, to the writer."""
+    path = request.url.path
+    if subscriber is None or not (
+        (request.method == "POST" and path in WRITE_PATHS)
+        or path.startswith(GRAPH_QUERY_PREFIX)
+    ):
+        return await call_next(request)
+    if request.url.query:
+        path += "?" + request.url.query
+    body = await request.body() if request.method == "POST" else None
+    content_type = request.headers.get("content-type", "application/json")
+    status, content, media_type = await run_in_threadpool(
+        _forward_to_writer, request.method, path, body, content_type
+    )
+    return Response(content, status_code=status, media_type=media_type or None)
+
+
+def _data_versions() -> Tuple[str, int, int]:
+    """(run id, snapshot version, specs version) reads are served from.
+
+    Never computes a snapshot, so it is safe to call per request.
+    """
+    if subscriber is not None:
+        manifest = subscriber.manifest or {}
+        specs_version = manifest["specs"]["version"] if manifest else 0
+        return manifest.get("boot_id", ""), subscriber.snapshot().version, specs_version
+    # Without the background worker, a read recomputes to the graph version
+    snapshot_version = engine.latest_snapshot().version if scheduler.running else engine.version
+    return BOOT_ID, snapshot_version, relevancy_engine.specs_version
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """ETags from data versions; 304s and cached bodies while they are unchanged."""
+    uses = CACHEABLE_PATHS.get(request.url.path)
+    if uses is None or request.method != "GET":
+        return await call_next(request)
+    if "fields" in request.query_params or "order" in request.query_params:
+        uses = (True, True)  # Rows may mix scores and spec fields
+    boot_id, snapshot_version, specs_version = _data_versions()
+    etag = 'W/"{}-{}-{}"'.format(
+        boot_id, snapshot_version if uses[0] else "", specs_version if uses[1] else ""
+    )
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"max-age={RESPONSE_MAX_AGE_S}" if RESPONSE_MAX_AGE_S else "no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())), etag)
+    cached = response_cache.get(key)
+    if cached is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        if response.headers.get("content-type") == "application/x-ndjson":
+            response.headers.update(headers)  # Streamed, not buffered for the cache
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        cached = body, response.headers.get("content-type", "application/json")
+        response_cache.put(key, *cached)
+    body, media_type = cached
+    return Response(body, media_type=media_type, headers=headers)
+
+
+# Added last so it wraps the other middleware and their responses
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=False,  # Must be False when allow_origins is "*"
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["*"],
+    expose_headers=["*"],
+)
+
+
 # --- API Endpoints ---
 
 
@@ -764,6 +1002,27 @@ class SmartDiscoverRequest(BaseModel):
     limit: int = 10
     pagerank_weight: float = 0.4
     relevancy_weight: float = 0.6
+    category: Optional[str] = None
+    tags: List[str] = []
+    capability: List[str] = []
+    deadline: Optional[float] = None  # Seconds to wait for LLM relevancy
+    viewer: Optional[str] = None  # Rank by trust from this agent's viewpoint
+    depth: int = 50  # Candidates drawn from the whole graph for reranking
+
+
+def _split(values: Optional[str]) -> List[str]:
+    """Comma-separated query parameter to a list."""
+    return values.split(",") if values else []
+
+
+def _ranked_candidates(
+    snap, min_score: float, n: int, category=None, tags=(), capabilities=()
+) -> List[Tuple[str, float]]:
+    """Top agents by score, narrowed by spec facets before any scoring."""
+    allowed = relevancy_engine.filter_agents(category, tags, capabilities)
+    if allowed is None:
+        return snap.above(min_score, n)
+    return snap.above_among(allowed, min_score, n)
 
 
 @app.get("/health")
@@ -771,81 +1030,435 @@ def health():
     return {"status": "ok"}
 
 
+def _page(listing, snap, cursor, limit, fields, format, **extra):
+    """One page of `listing` as JSON, or the rest of it (up to `limit`) as NDJSON."""
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+    try:
+        start = listing.start(decode_cursor(cursor, listing.order) if cursor else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format == "ndjson" and limit is None:
+        end = len(listing)
+    else:
+        cap = PAGE_MAX_LIMIT if format == "json" else len(listing)
+        end = min(start + max(1, min(limit or PAGE_DEFAULT_LIMIT, cap)), len(listing))
+    records = rows(listing.addresses[start:end], fields, snap, relevancy_engine.agent_specs)
+    next_cursor = listing.cursor(end)
+    if format == "ndjson":
+        # Encoded as it is sent; the cursor goes in a header
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return StreamingResponse(
+            ndjson(records), media_type="application/x-ndjson", headers=headers
+        )
+    return {
+        "agents": list(records),
+        "count": end - start,
+        "total": len(listing),
+        "next_cursor": next_cursor,
+        **extra,
+    }
+
+
+def _unpaged(*page_params) -> bool:
+    """Whether a listing request uses none of the paging parameters."""
+    return all(p is None for p in page_params)
+
+
+def _page_params(order: str, fields: Optional[str], default_fields: Tuple[str, ...]):
+    if order not in ORDERS:
+        raise HTTPException(status_code=400, detail=f"order must be one of {', '.join(ORDERS)}")
+    try:
+        return parse_fields(fields, default_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/scores")
-def get_all_scores():
-    """Get all agent scores."""
-    scores = engine.compute_scores()
-    return {"scores": scores, "count": len(scores)}
+def get_all_scores(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    order: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None,
+):
+    """Get all agent scores.
+
+    Without parameters, every score in one `{address: score}` map. With
+    any of `limit`, `cursor`, `order`, `fields` or `format`, a page of
+    agents in score (default) or address order with the projected
+    `fields`, and a `next_cursor`; `format=ndjson` streams rows instead.
+    """
+    snap = current_snapshot()
+    if _unpaged(limit, cursor, order, fields, format):
+        return {"scores": snap.scores, "count": len(snap.scores), "snapshot": snap.info()}
+    order = order or "score"
+    fields = _page_params(order, fields, SCORE_ROW_FIELDS)
+    listing = listings.get(
+        "scores", order, str(snap.version), lambda: scores_listing(snap, order)
+    )
+    return _page(listing, snap, cursor, limit, fields, format or "json", snapshot=snap.info())
+
+
+@app.get("/scores/status")
+def get_scores_status():
+    """Report pending writes and freshness of the served score snapshot."""
+    if subscriber is not None:
+        return subscriber.status()
+    return scheduler.status()
+
+
+def _subscribe_scores(
+    min_change: float, min_rank_change: Optional[int], watch: Optional[str], limit: int
+):
+    """Register a score change subscriber, or None when the stream is full."""
+    return score_stream.subscribe(
+        score_threshold=max(min_change, 0.0),
+        rank_threshold=min_rank_change,
+        watch=[a.strip() for a in _split(watch) if a.strip()],
+        limit=max(1, min(limit, 1000)),
+    )
+
+
+@app.get("/scores/stream")
+async def stream_score_changes(
+    request: Request,
+    min_change: float = 0.01,
+    min_rank_change: Optional[int] = None,
+    watch: Optional[str] = None,
+    limit: int = 100,
+):
+    """Server-sent events with the agents whose score or rank moved after each recompute.
+
+    An agent is included when its score moved by more than `min_change`
+    or its rank by more than `min_rank_change`; comma-separated `watch`
+    addresses restrict the stream to those agents. A client that falls
+    behind gets a `resync` event in place of the changes it missed.
+    """
+    sub = _subscribe_scores(min_change, min_rank_change, watch, limit)
+    if sub is None:
+        raise HTTPException(status_code=503, detail="Too many score stream subscribers")
+
+    async def events():
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(sub.queue.get(), STREAM_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {data}\n\n"
+        finally:
+            score_stream.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/scores/ws")
+async def stream_score_changes_ws(
+    websocket: WebSocket,
+    min_change: float = 0.01,
+    min_rank_change: Optional[int] = None,
+    watch: Optional[str] = None,
+    limit: int = 100,
+):
+    """/scores/stream over a WebSocket; each message is `{"type": event, "data": ...}`."""
+    await websocket.accept()
+    sub = _subscribe_scores(min_change, min_rank_change, watch, limit)
+    if sub is None:
+        await websocket.close(code=1013, reason="Too many score stream subscribers")
+        return
+
+    async def send():
+        while True:
+            event, data = await sub.queue.get()
+            await websocket.send_text(f'{{"type":"{event}","data":{data}}}')
+
+    sender = asyncio.ensure_future(send())
+    try:
+        # Client messages are ignored; this only waits for the disconnect
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        score_stream.unsubscribe(sub)
+
+
+@app.get("/scores/stream/status")
+def get_score_stream_status():
+    """Subscriber count, lagging clients and timing of the last published change."""
+    return score_stream.stats()
+
+
+def _personalized_ranking(
+    seeds: List[str],
+    limit: int,
+    min_score: float = 0,
+    epsilon: float = 1.0e-4,
+    category: Optional[str] = None,
+    tags=(),
+    capabilities=(),
+) -> Optional[Tuple[List[Tuple[str, float]], int]]:
+    """Agents ranked by personalized PageRank from `seeds`, best scaled to 1.0.
+
+    Seeds are left out of the ranking. Returns the ranking and the
+    number of pushes, or None when no seed is in the graph.
+    """
+    result = engine.personalized_scores(seeds, epsilon)
+    if result is None:
+        return None
+    scores, pushes = result
+    for seed in seeds:
+        scores.pop(seed, None)
+    best = max(scores.values(), default=0.0) or 1.0
+    allowed = relevancy_engine.filter_agents(category, tags, capabilities)
+    ranked = heapq.nlargest(
+        limit,
+        (
+            (a, s / best)
+            for a, s in scores.items()
+            if s / best >= min_score and (allowed is None or a in allowed)
+        ),
+        key=lambda x: x[1],
+    )
+    return ranked, pushes
+
+
+@app.get("/scores/personalized/{agent}")
+def get_personalized_scores(
+    agent: str,
+    limit: int = 20,
+    min_score: float = 0,
+    seeds: Optional[str] = None,
+    epsilon: float = 1.0e-4,
+    category: Optional[str] = None,
+    tags: Optional[str] = None,
+    capability: Optional[str] = None,
+):
+    """Trust scores from an agent's point of view (personalized PageRank).
+
+    Additional comma-separated `seeds` share the viewpoint. Smaller
+    `epsilon` is more accurate but touches more of the graph.
+    """
+    started = time.perf_counter()
+    seed_list = [agent.lower()] + [s.strip().lower() for s in _split(seeds) if s.strip()]
+    result = _personalized_ranking(
+        seed_list,
+        min(limit, 1000),
+        min_score,
+        max(epsilon, 1.0e-6),
+        category,
+        _split(tags),
+        _split(capability),
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Agent not found in the interaction graph")
+    ranked, pushes = result
+    return {
+        "agent": agent.lower(),
+        "seeds": seed_list,
+        "agents": [{"address": a, "score": round(s, 4)} for a, s in ranked],
+        "pushes": pushes,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
 
 
 @app.get("/scores/{agent}")
 def get_agent_score(agent: str):
     """Get score for specific agent."""
-    score = engine.get_score(agent)
-    return {"agent": agent.lower(), "score": round(score, 4)}
+    snap = current_snapshot()
+    agent = agent.lower()
+    score = snap.scores.get(agent, 0)
+    return {
+        "agent": agent,
+        "score": round(score, 4),
+        "rank": snap.rank(agent),
+        "percentile": snap.percentile(agent),
+        "snapshot": snap.info(),
+    }
 
 
 @app.get("/leaderboard")
-def get_leaderboard(limit: int = 10, min_score: float = 0):
-    """Get top agents with their specifications and ENS names."""
-    top = engine.get_top_agents(limit * 2)  # Get extra to filter
-    filtered = [(a, s) for a, s in top if s >= min_score][:limit]
-    agents = []
-    for addr, score in filtered:
-        agent_data = {"address": addr, "score": round(score, 4)}
-        spec = relevancy_engine.get_agent_spec(addr)
-        if spec:
-            agent_data["name"] = spec.get("name", "Unknown Agent")
-            agent_data["description"] = spec.get("description", "")
-            agent_data["capabilities"] = spec.get("capabilities", [])
-            agent_data["tags"] = spec.get("tags", [])
-            agent_data["category"] = spec.get("category", "general")
-            if spec.get("ens_name"):
-                agent_data["ens_name"] = spec["ens_name"]
-        agents.append(agent_data)
-    return {"agents": agents}
+def get_leaderboard(
+    limit: int = 10,
+    min_score: float = 0,
+    category: Optional[str] = None,
+    tags: Optional[str] = None,
+    capability: Optional[str] = None,
+):
+    """Get top agents with their specifications and ENS names.
+
+    `tags` and `capability` take comma-separated values; an agent must
+    match all of them.
+    """
+    snap = current_snapshot()
+    filtered = _ranked_candidates(
+        snap, min_score, limit, category, _split(tags), _split(capability)
+    )
+    content = AgentRecords.response(agent_records.entries(snap, filtered), snapshot=snap.info())
+    return Response(content, media_type="application/json")
 
 
 @app.get("/discover")
-def discover_agents(min_score: float = 0, limit: int = 10):
-    """Discover agents above threshold with their specifications and ENS names."""
-    top = engine.get_top_agents(50)
-    filtered = [(a, s) for a, s in top if s >= min_score][:limit]
-    agents = []
-    for addr, score in filtered:
-        agent_data = {"address": addr, "score": round(score, 4)}
-        spec = relevancy_engine.get_agent_spec(addr)
-        if spec:
-            agent_data["name"] = spec.get("name", "Unknown Agent")
-            agent_data["description"] = spec.get("description", "")
-            agent_data["capabilities"] = spec.get("capabilities", [])
-            agent_data["tags"] = spec.get("tags", [])
-            agent_data["category"] = spec.get("category", "general")
-            if spec.get("ens_name"):
-                agent_data["ens_name"] = spec["ens_name"]
-        agents.append(agent_data)
-    return {
-        "agents": agents,
-        "total_agents": len(engine.graph.nodes()),
-    }
+def discover_agents(
+    min_score: float = 0,
+    limit: int = 10,
+    category: Optional[str] = None,
+    tags: Optional[str] = None,
+    capability: Optional[str] = None,
+    query: Optional[str] = None,
+):
+    """Discover agents above threshold with their specifications and ENS names.
+
+    With a `query`, agents are ranked over the whole graph by PageRank
+    combined with their spec index score.
+    """
+    started = time.perf_counter()
+    snap = current_snapshot()
+    filtered = relevancy_engine.candidates(
+        query,
+        snap,
+        min(limit, DISCOVER_MAX_DEPTH),
+        min_score,
+        category,
+        _split(tags),
+        _split(capability),
+    )
+    if query:
+        agents = [
+            agent_records.with_fields(
+                {"address": a, "score": round(s, 4), "relevancy_score": round(t, 4)}
+            )
+            for a, s, t in filtered
+        ]
+    else:
+        agents = agent_records.entries(snap, ((a, s) for a, s, _ in filtered))
+    content = AgentRecords.response(
+        agents,
+        total_agents=len(snap.scores),
+        snapshot=snap.info(),
+        timing={"candidates_ms": round((time.perf_counter() - started) * 1000, 3)},
+    )
+    return Response(content, media_type="application/json")
 
 
 @app.post("/interactions")
 def add_interaction(req: InteractionRequest):
     """Record new interaction."""
-    engine.add_interaction(
+    persistence.add_interaction(
         req.from_agent.lower(), req.to_agent.lower(), req.interaction_type
     )
+    scheduler.notify_write()
     return {"status": "ok"}
 
 
+async def _batch_records(request: Request) -> AsyncIterator[object]:
+    """Yield raw interaction records from a JSON array or NDJSON body.
+
+    NDJSON bodies are parsed line by line as they stream in; malformed
+    lines are yielded as the ValueError raised while decoding them.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        yield e
+        if pending.strip():
+            try:
+                yield json.loads(pending)
+            except ValueError as e:
+                yield e
+        return
+
+    try:
+        body = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of interactions")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of interactions")
+    for record in body:
+        yield record
+
+
+def _validate_interaction(record: object) -> Tuple[str, str, str, None]:
+    """Validate one batch record into an engine interaction tuple."""
+    if isinstance(record, ValueError):
+        raise ValueError(f"invalid JSON: {record}")
+    req = InteractionRequest.model_validate(record)
+    if not req.from_agent.strip() or not req.to_agent.strip():
+        raise ValueError("from_agent and to_agent must be non-empty")
+    return req.from_agent.lower(), req.to_agent.lower(), req.interaction_type, None
+
+
+@app.post("/interactions/batch")
+async def add_interactions_batch(request: Request):
+    """Record many interactions as one batched graph update.
+
+    Accepts a JSON array of interactions, or NDJSON (one per line) with
+    an application/x-ndjson content type. Valid records are applied
+    together with a single version bump; invalid ones are reported.
+    """
+    started = time.perf_counter()
+    accepted = []
+    errors = []
+    rejected = 0
+    index = 0
+    async for record in _batch_records(request):
+        if index >= BATCH_MAX_INTERACTIONS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch exceeds {BATCH_MAX_INTERACTIONS} interactions",
+            )
+        try:
+            accepted.append(_validate_interaction(record))
+        except (ValidationError, ValueError) as e:
+            rejected += 1
+            if len(errors) < BATCH_MAX_ERRORS:
+                if isinstance(e, ValidationError):
+                    first = e.errors()[0]
+                    message = ".".join(str(p) for p in first["loc"]) + ": " + first["msg"]
+                else:
+                    message = str(e)
+                errors.append({"index": index, "error": message})
+        index += 1
+
+    edges = await run_in_threadpool(persistence.add_interactions, accepted)
+    if accepted:
+        scheduler.notify_write()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "status": "ok",
+        "accepted": len(accepted),
+        "rejected": rejected,
+        "errors": errors,
+        "edges_updated": edges,
+        "version": engine.version,
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "interactions_per_s": round(index / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
 # --- Agent Specification Endpoints ---
 
 
 @app.post("/agents/register")
 def register_agent(req: AgentSpecRequest):
     """Register or update an agent's specification with optional ENS name."""
-    relevancy_engine.register_agent(req.address, req.model_dump())
+    persistence.register_agent(req.address, req.model_dump())
     return {"status": "registered", "address": req.address.lower(), "ens_name": req.ens_name}
 
 
@@ -859,39 +1472,168 @@ def get_agent_spec(address: str):
 
 
 @app.get("/agents/specs")
-def get_all_agent_specs():
-    """Get all registered agent specifications."""
+def get_all_agent_specs(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    order: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None,
+):
+    """Get all registered agent specifications.
+
+    Paged like /scores, in address order by default; `order=score`
+    puts agents without a score last.
+    """
     specs = relevancy_engine.get_all_specs()
-    return {"agents": specs, "count": len(specs)}
+    if _unpaged(limit, cursor, order, fields, format):
+        return {"agents": specs, "count": len(specs)}
+    order = order or "address"
+    fields = _page_params(order, fields, SPEC_ROW_FIELDS)
+    specs_version = relevancy_engine.specs_version
+    if order == "score" or "score" in fields or "rank" in fields:
+        snap = current_snapshot()
+    else:
+        snap = None
+    if order == "score":
+        version = f"{specs_version}.{snap.version}"
+    else:
+        version = str(specs_version)
+    listing = listings.get(
+        "specs", order, version, lambda: specs_listing(specs, specs_version, snap, order)
+    )
+    return _page(listing, snap, cursor, limit, fields, format or "json")
 
 
 # --- Smart Discovery with LLM Relevancy ---
 
 
+@app.get("/relevancy/cache")
+def get_relevancy_cache_stats():
+    """Report relevancy cache size and hit/miss counters."""
+    return relevancy_engine.cache.stats()
+
+
+@app.get("/responses/cache")
+def get_response_cache_stats():
+    """HTTP response cache size and hit/304 counts."""
+    return response_cache.stats()
+
+
+@app.get("/discover/smart/status")
+def get_smart_discover_status():
+    """Report how many smart-discovery requests were coalesced."""
+    return smart_discover_flights.stats()
+
+
+def _smart_discover_key(req: SmartDiscoverRequest, snap) -> tuple:
+    """Requests with equal keys get identical responses."""
+    return (
+        normalize_query(req.query),
+        req.min_score,
+        req.limit,
+        req.pagerank_weight,
+        req.relevancy_weight,
+        (req.category or "").strip().lower(),
+        tuple(sorted(t.strip().lower() for t in req.tags)),
+        tuple(sorted(c.strip().lower() for c in req.capability)),
+        req.deadline,
+        (req.viewer or "").lower(),
+        req.depth,
+        snap.version,
+    )
+
+
 @app.post("/discover/smart")
 async def smart_discover(req: SmartDiscoverRequest):
     """
     Discover agents using combined PageRank + LLM relevancy scoring.
 
     This endpoint:
-    1. Gets top agents by PageRank score
-    2. Uses Gemini to compute relevancy to the user's query
+    1. Draws `depth` candidates from the whole graph by PageRank and
+       local spec index score (or from the viewer's personalized ranking)
+    2. Has the LLM provider rerank the best index matches among them
+       (index scores only without one)
     3. Combines scores with configurable weights
-    4. Returns agents sorted by combined score
+    4. Returns agents sorted by combined score, with per-stage timing
+
+    Concurrent requests with the same normalized query, parameters and
+    score snapshot share one computation.
     """
-    # Get top agents by PageRank
-    top = engine.get_top_agents(50)
-    agents = [
-        {"address": a, "pagerank_score": round(s, 4)}
-        for a, s in top
-        if s >= req.min_score
-    ]
+    snap = await current_snapshot_async()
+    key = _smart_discover_key(req, snap)
+    result = await smart_discover_flights.do(key, lambda: _smart_discover(req, snap))
+    fields = dict(result, query=req.query)
+    content = AgentRecords.response(fields.pop("agents"), **fields)
+    return Response(content, media_type="application/json")
+
+
+async def _viewer_candidates(req: SmartDiscoverRequest, depth: int) -> List[Tuple[str, float]]:
+    """Top candidates by personalized PageRank from `req.viewer`."""
+    if subscriber is None:
+        result = await run_in_threadpool(
+            _personalized_ranking,
+            [req.viewer.lower()],
+            depth,
+            req.min_score,
+            1.0e-4,
+            req.category,
+            req.tags,
+            req.capability,
+        )
+        return result[0] if result is not None else []
+    query = {"limit": depth, "min_score": req.min_score}
+    if req.category:
+        query["category"] = req.category
+    if req.tags:
+        query["tags"] = ",".join(req.tags)
+    if req.capability:
+        query["capability"] = ",".join(req.capability)
+    path = (
+        GRAPH_QUERY_PREFIX
+        + urllib.parse.quote(req.viewer.lower())
+        + "?"
+        + urllib.parse.urlencode(query)
+    )
+    status, body, _ = await run_in_threadpool(_forward_to_writer, "GET", path)
+    if status != 200:
+        return []
+    return [(a["address"], a["score"]) for a in json.loads(body)["agents"]]
+
+
+async def _smart_discover(req: SmartDiscoverRequest, snap) -> dict:
+    started = time.perf_counter()
+    depth = max(1, min(req.depth, DISCOVER_MAX_DEPTH))
+    # Stage 1: candidates from the viewer's point of view if given,
+    # otherwise from every agent by PageRank and spec index score
+    candidates = await _viewer_candidates(req, depth) if req.viewer else []
+    if not candidates:
+        found = await run_in_threadpool(
+            relevancy_engine.candidates,
+            req.query,
+            snap,
+            depth,
+            req.min_score,
+            req.category,
+            req.tags,
+            req.capability,
+            req.pagerank_weight,
+            req.relevancy_weight,
+        )
+        candidates = [(a, s) for a, s, _ in found]
+    agents = [{"address": a, "pagerank_score": round(s, 4)} for a, s in candidates]
+    candidates_done = time.perf_counter()
 
     if not agents:
-        return {"agents": [], "query": req.query, "total_agents": 0}
+        return {
+            "agents": [],
+            "query": req.query,
+            "total_agents": 0,
+            "snapshot": snap.info(),
+        }
 
-    # Compute relevancy scores using LLM
-    agents = await relevancy_engine.compute_relevancy(req.query, agents)
+    # Stage 2: rerank with the LLM
+    agents = await relevancy_engine.compute_relevancy(req.query, agents, req.deadline)
+    rerank_done = time.perf_counter()
 
     # Compute combined scores
     for agent in agents:
@@ -904,21 +1646,25 @@ async def smart_discover(req: SmartDiscoverRequest):
             ),
             4,
         )
-        # Add agent spec info if available
-        spec = relevancy_engine.get_agent_spec(agent["address"])
-        if spec:
-            agent["name"] = spec.get("name", "Unknown")
-            agent["description"] = spec.get("description", "")
-            agent["category"] = spec.get("category", "general")
-
-    # Sort by combined score and limit
+
+    # Sort by combined score and limit, then add spec info if available
     agents = sorted(agents, key=lambda x: x["combined_score"], reverse=True)[
         : req.limit
     ]
+    agents = [agent_records.with_fields(agent, summary=True) for agent in agents]
 
     return {
         "agents": agents,
         "query": req.query,
         "weights": {"pagerank": req.pagerank_weight, "relevancy": req.relevancy_weight},
-        "total_agents": len(engine.graph.nodes()),
+        "viewer": req.viewer.lower() if req.viewer else None,
+        "depth": depth,
+        "candidates": len(candidates),
+        "total_agents": len(snap.scores),
+        "snapshot": snap.info(),
+        "timing": {
+            "candidates_ms": round((candidates_done - started) * 1000, 3),
+            "rerank_ms": round((rerank_done - candidates_done) * 1000, 3),
+            "total_ms": round((time.perf_counter() - started) * 1000, 3),
+        },
     }
@@ -1,6 +1,274 @@
+import bisect
+import heapq
+import math
+import multiprocessing
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
 import networkx as nx
+import numpy as np
+import scipy.sparse as sp
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from graph_store import make_store
+
+
+def power_iteration(
+    adjacency: sp.csr_array,
+    alpha: float,
+    nstart: Optional[np.ndarray] = None,
+    max_iter: int = 100,
+    tol: float = 1.0e-06,
+) -> Tuple[np.ndarray, int]:
+    """Weighted PageRank by power iteration, mirroring `nx.pagerank`.
+
+    `adjacency[u, v]` holds the summed weight of u -> v. Dangling nodes
+    spread their rank uniformly. Returns the stationary vector and the
+    number of iterations it took to converge; pass the previous vector
+    as `nstart` to warm-start.
+    """
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    inv = _inverse_out_weight(out_weight)
+    transition_t = (sp.diags_array(inv) @ adjacency).T.tocsr()
+    return _iterate(lambda x: transition_t @ x, out_weight == 0, alpha, nstart, max_iter, tol)
+
+
+def streamed_power_iteration(
+    store,
+    alpha: float,
+    nstart: Optional[np.ndarray] = None,
+    max_iter: int = 100,
+    tol: float = 1.0e-06,
+) -> Tuple[np.ndarray, int]:
+    """`power_iteration` over a store that streams its edges.
+
+    The store provides `out_weight()` and `propagate(x)`; each iteration
+    is one pass over the edge table and no matrix is ever built.
+    """
+    out_weight = store.out_weight()
+    inv = _inverse_out_weight(out_weight)
+    return _iterate(
+        lambda x: store.propagate(x * inv), out_weight == 0, alpha, nstart, max_iter, tol
+    )
+
+
+def _inverse_out_weight(out_weight: np.ndarray) -> np.ndarray:
+    inv = np.zeros(len(out_weight))
+    nonzero = out_weight != 0
+    inv[nonzero] = 1.0 / out_weight[nonzero]
+    return inv
+
+
+def _iterate(step, dangling, alpha, nstart, max_iter, tol) -> Tuple[np.ndarray, int]:
+    N = len(dangling)
+    if nstart is None:
+        x = np.repeat(1.0 / N, N)
+    else:
+        x = np.asarray(nstart, dtype=float)
+        x = x / x.sum()
+    teleport = (1 - alpha) / N
+
+    for i in range(max_iter):
+        xlast = x
+        x = alpha * (step(x) + xlast[dangling].sum() / N) + teleport
+        if np.abs(x - xlast).sum() < N * tol:
+            return x, i + 1
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def _pagerank_worker(
+    n: int, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, alpha: float
+) -> Tuple[np.ndarray, int]:
+    """Process-pool entry point: power iteration over a CSR edge table."""
+    adjacency = sp.csr_array((data, indices, indptr), shape=(n, n))
+    return power_iteration(adjacency, alpha)
+
+
+class TransitionGraph(NamedTuple):
+    """Row-stochastic transition matrix as CSR arrays, for push queries."""
+
+    version: int
+    nodes: List[str]
+    index: Dict[str, int]
+    indptr: np.ndarray
+    indices: np.ndarray
+    probs: np.ndarray
+
+
+def personalized_push(
+    graph: TransitionGraph, seeds: List[int], alpha: float, epsilon: float
+) -> Tuple[Dict[int, float], int]:
+    """Approximate personalized PageRank by forward push (Andersen et al.).
+
+    Teleports (and dangling nodes) return to the seeds, as with
+    `nx.pagerank(personalization=...)`. Every node's leftover residual
+    is below `epsilon`, and only nodes that receive at least that much
+    mass are touched. Returns scores by node index and the push count.
+    """
+    rank: Dict[int, float] = {}
+    residual: Dict[int, float] = {s: 1.0 / len(seeds) for s in seeds}
+    queue = deque(seeds)
+    pushes = 0
+    while queue:
+        u = queue.popleft()
+        r = residual.get(u, 0.0)
+        if r < epsilon:
+            continue
+        residual[u] = 0.0
+        rank[u] = rank.get(u, 0.0) + (1 - alpha) * r
+        pushes += 1
+        start, end = graph.indptr[u], graph.indptr[u + 1]
+        if start == end:
+            targets = zip(seeds, [1.0 / len(seeds)] * len(seeds))
+        else:
+            targets = zip(graph.indices[start:end].tolist(), graph.probs[start:end].tolist())
+        mass = alpha * r
+        for v, p in targets:
+            before = residual.get(v, 0.0)
+            after = before + mass * p
+            residual[v] = after
+            if before < epsilon <= after:
+                queue.append(v)
+    return rank, pushes
+
+
+class ScoreSnapshot:
+    """Normalized PageRank scores computed for one graph version.
+
+    Alongside the scores it keeps a rank-ordered index, built once per
+    snapshot, so top-N, rank/percentile lookups and min-score range
+    queries never re-sort.
+    """
+
+    def __init__(
+        self,
+        scores: Dict[str, float],
+        version: int,
+        compute_ms: float,
+        method: str = "full",
+    ):
+        self.scores = scores
+        self.version = version
+        self.compute_ms = compute_ms
+        self.method = method
+        self.computed_at = datetime.utcnow()
+
+        agents = list(scores)
+        values = np.fromiter(scores.values(), dtype=float, count=len(agents))
+        order = np.argsort(-values, kind="stable")
+        self._index([agents[i] for i in order], values[order])
+
+    @classmethod
+    def from_ranked(
+        cls,
+        ranked_agents: List[str],
+        ranked_scores: np.ndarray,
+        version: int,
+        compute_ms: float,
+        method: str,
+        computed_at: datetime,
+    ) -> "ScoreSnapshot":
+        """Rebuild a snapshot from its rank-ordered arrays, without re-sorting."""
+        snap = cls.__new__(cls)
+        snap.scores = dict(zip(ranked_agents, ranked_scores.tolist()))
+        snap.version = version
+        snap.compute_ms = compute_ms
+        snap.method = method
+        snap.computed_at = computed_at
+        snap._index(ranked_agents, ranked_scores)
+        return snap
+
+    def _index(self, ranked_agents: List[str], ranked_scores: np.ndarray):
+        self.ranked_agents: List[str] = ranked_agents
+        self.ranked_scores: np.ndarray = ranked_scores
+        self._descending_keys = -self.ranked_scores  # ascending, for searchsorted
+        self._ranks: Dict[str, int] = {a: i + 1 for i, a in enumerate(self.ranked_agents)}
+
+    def info(self) -> dict:
+        """Freshness metadata for API responses."""
+        return {
+            "version": self.version,
+            "computed_at": self.computed_at.isoformat() + "Z",
+            "compute_ms": round(self.compute_ms, 3),
+            "method": self.method,
+        }
+
+    def age_seconds(self) -> float:
+        """Seconds since this snapshot was computed."""
+        return (datetime.utcnow() - self.computed_at).total_seconds()
+
+    def top(self, n: int = 10) -> List[Tuple[str, float]]:
+        """Return the N highest-scoring agents."""
+        return list(zip(self.ranked_agents[:n], self.ranked_scores[:n].tolist()))
+
+    def count_at_least(self, min_score: float) -> int:
+        """Number of agents scoring >= min_score (binary search)."""
+        return int(np.searchsorted(self._descending_keys, -min_score, side="right"))
+
+    def above(self, min_score: float, n: int, offset: int = 0) -> List[Tuple[str, float]]:
+        """Up to N agents scoring >= min_score, best first, skipping `offset`."""
+        if n <= 0:
+            return []
+        end = min(self.count_at_least(min_score), offset + n)
+        return list(
+            zip(self.ranked_agents[offset:end], self.ranked_scores[offset:end].tolist())
+        )
+
+    def above_among(
+        self, agents: Iterable[str], min_score: float, n: int
+    ) -> List[Tuple[str, float]]:
+        """Like above(), restricted to a candidate set of agents."""
+        if n <= 0:
+            return []
+        end = self.count_at_least(min_score)
+        if isinstance(agents, (set, frozenset)) and n * end < 16 * len(agents) ** 2:
+            # Broad filter: walking the ranking finds n matches long
+            # before looking up every candidate would.
+            result = []
+            for start in range(0, end, 4096):
+                chunk = self.ranked_agents[start : min(start + 4096, end)]
+                for i, agent in enumerate(chunk, start):
+                    if agent in agents:
+                        result.append((agent, float(self.ranked_scores[i])))
+                        if len(result) == n:
+                            return result
+            return result
+        ranks = heapq.nsmallest(n, (self._ranks[a] for a in agents if a in self._ranks))
+        result = []
+        for rank in ranks:
+            score = float(self.ranked_scores[rank - 1])
+            if score < min_score:
+                break
+            result.append((self.ranked_agents[rank - 1], score))
+        return result
+
+    def changes_since(self, previous: "ScoreSnapshot") -> Tuple[np.ndarray, np.ndarray]:
+        """Score and rank of each agent in `previous`, in this snapshot's rank order.
+
+        Agents new in this snapshot get score 0 and rank 0.
+        """
+        n = len(self.ranked_agents)
+        scores, ranks = previous.scores, previous._ranks
+        old_scores = np.fromiter((scores.get(a, 0.0) for a in self.ranked_agents), float, n)
+        old_ranks = np.fromiter((ranks.get(a, 0) for a in self.ranked_agents), np.int64, n)
+        return old_scores, old_ranks
+
+    def rank(self, agent: str) -> Optional[int]:
+        """1-based position of an agent in the ranking, or None if unranked."""
+        return self._ranks.get(agent)
+
+    def percentile(self, agent: str) -> Optional[float]:
+        """Share of other agents ranked below this one, 0-100."""
+        rank = self._ranks.get(agent)
+        if rank is None:
+            return None
+        others = len(self.ranked_agents) - 1
+        return 100.0 if others == 0 else round(100 * (others - rank + 1) / others, 2)
+
 
 class DignitasPageRank:
     """Weighted PageRank for AI agent reputation."""
@@ -10,9 +278,61 @@ class DignitasPageRank:
     WEIGHT_X402 = 2.0
     WEIGHT_FEEDBACK = 1.2
     WEIGHT_NEGATIVE = 0.01  # Minimal weight, acts as a "dampener" or lack of trust
+    TOLERANCE = 1.0e-07  # Per-node convergence tolerance in incremental mode
+    MAX_PUSH_DRIFT = 1.0e-04  # Dangling mass forward push may drop before a warm start
+    REBASE_HALF_LIVES = 64  # Move the decay epoch before weights grow past 2**64
+    WRITE_BUFFER_LIMIT = 50_000  # Writers apply the buffer themselves past this
     
-    def __init__(self):
-        self.graph = nx.DiGraph()
+    def __init__(
+        self,
+        incremental: bool = False,
+        backend: str = "networkx",
+        workers: int = 0,
+        **store_options,
+    ):
+        self.store = make_store(backend, **store_options)
+        # With workers > 0, full PageRank runs in a process pool fed the
+        # CSR arrays, so it does not compete for this process's GIL.
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Transition matrix for personalized queries, rebuilt by the
+        # first query after each snapshot
+        self._transition: Optional[TransitionGraph] = None
+        # Edge weights are stored scaled to this reference time, i.e.
+        # base * 2 ** ((timestamp - epoch) / half-life). The decayed
+        # weight at any time t is then stored * decay_factor(t), a single
+        # factor shared by every edge.
+        self.decay_epoch = datetime.utcnow()
+        # Incremental mode reuses the previous stationary vector: small
+        # changes are absorbed by forward push over the touched
+        # neighborhood, anything else warm-starts power iteration.
+        self.incremental = incremental
+        self._rank: Dict[str, float] = {}
+        self._out_weight: Dict[str, float] = {}
+        self._changed_rows: Dict[str, Dict[str, float]] = {}
+        self._needs_global = True
+        # Forward push leaves residuals below TOLERANCE unpushed; they are
+        # carried into the next push. Dangling mass it cannot place is
+        # dropped and counted, and a warm start settles both.
+        self._residual: Dict[str, float] = {}
+        self._dropped_mass = 0.0
+        self.last_iterations = 0
+        self.last_pushes = 0
+        # Bumped on every graph mutation; the cached snapshot is valid
+        # only while its version matches.
+        self.version = 0
+        self._snapshot: Optional[ScoreSnapshot] = None
+        # Total interactions applied, and how many the snapshot has seen;
+        # a batch counts each interaction but bumps the version once.
+        self.interaction_count = 0
+        self._snapshot_interactions = 0
+        # Writers only append to the write buffer under _buffer_lock;
+        # the buffer is applied to the store under _lock, which also
+        # serializes PageRank runs (possibly on the background recompute
+        # thread). Readers use the immutable snapshot, swapped in whole.
+        self._write_buffer: List[Tuple[str, str, str, datetime]] = []
+        self._buffer_lock = threading.Lock()
+        self._lock = threading.RLock()
     
     def add_interaction(
         self,
@@ -23,46 +343,635 @@ class DignitasPageRank:
     ):
         """Add an edge between agents."""
         timestamp = timestamp or datetime.utcnow()
-        weight = self._calc_weight(interaction_type, timestamp)
-        
-        if self.graph.has_edge(from_agent, to_agent):
-            self.graph[from_agent][to_agent]['weight'] += weight
-        else:
-            self.graph.add_edge(from_agent, to_agent, weight=weight)
+        with self._buffer_lock:
+            self._write_buffer.append((from_agent, to_agent, interaction_type, timestamp))
+            self.interaction_count += 1
+            self.version += 1
+        self._maybe_drain()
+
+    def add_interactions(
+        self, interactions: Iterable[Tuple[str, str, str, Optional[datetime]]]
+    ) -> int:
+        """Buffer many (from, to, type, timestamp) interactions as one update.
+
+        The store later receives the whole batch at once (aggregating per
+        edge as it sees fit) and the graph version is bumped once.
+        Returns the number of distinct edges updated.
+        """
+        now = datetime.utcnow()
+        rows = [(u, v, t, ts or now) for u, v, t, ts in interactions]
+        if not rows:
+            return 0
+        with self._buffer_lock:
+            self._write_buffer.extend(rows)
+            self.interaction_count += len(rows)
+            self.version += 1
+        self._maybe_drain()
+        return len({(u, v) for u, v, _, _ in rows})
+
+    def flush(self):
+        """Apply buffered writes to the store now."""
+        with self._lock:
+            self._drain()
+
+    def _maybe_drain(self):
+        """Apply a large write buffer now, unless a recompute holds the graph."""
+        if len(self._write_buffer) >= self.WRITE_BUFFER_LIMIT and self._lock.acquire(
+            blocking=False
+        ):
+            try:
+                self._drain()
+            finally:
+                self._lock.release()
+
+    def _drain(self) -> Tuple[int, int]:
+        """Apply buffered writes to the store; caller holds _lock.
+
+        Returns the (version, interaction_count) the store now reflects.
+        """
+        with self._buffer_lock:
+            buffered, self._write_buffer = self._write_buffer, []
+            state = self.version, self.interaction_count
+        if buffered:
+            self._apply(buffered)
+        return state
+
+    def _apply(self, interactions: List[Tuple[str, str, str, datetime]]):
+        """Write (from, to, type, timestamp) interactions to the store."""
+        rows: List[Tuple[str, str, float, str, datetime]] = []
+        for from_agent, to_agent, interaction_type, timestamp in interactions:
+            if self._half_lives(timestamp) > self.REBASE_HALF_LIVES:
+                # Weights computed so far are relative to the old epoch.
+                factor = self.decay_factor(timestamp)
+                self._rebase_decay(timestamp)
+                rows = [(u, v, w * factor, t, ts) for u, v, w, t, ts in rows]
+            weight = self._calc_weight(interaction_type, timestamp)
+            rows.append((from_agent, to_agent, weight, interaction_type, timestamp))
+        self._write_rows(rows)
+
+    def _write_rows(self, rows: List[Tuple[str, str, float, str, datetime]]):
+        """Hand weighted (from, to, weight, type, timestamp) rows to the store."""
+        if self.incremental:
+            for from_agent, to_agent, weight, _, _ in rows:
+                self._track_row_change(from_agent, to_agent, weight)
+        self.store.add_edges(rows)
     
     def _calc_weight(self, interaction_type: str, timestamp: datetime) -> float:
-        """Calculate weight with time decay."""
+        """Calculate weight scaled to the decay epoch."""
         if interaction_type == 'negative_feedback':
             base = self.WEIGHT_NEGATIVE
         elif interaction_type == 'x402':
             base = self.WEIGHT_X402
         else:
             base = self.WEIGHT_FEEDBACK
-            
-        days_ago = (datetime.utcnow() - timestamp).days
-        decay = 0.5 ** (days_ago / self.HALF_LIFE_DAYS)
-        return base * decay
+
+        return base * 2.0 ** self._half_lives(timestamp)
+
+    def _half_lives(self, at: datetime) -> float:
+        """Half-lives elapsed between the decay epoch and `at`."""
+        days = (at - self.decay_epoch).total_seconds() / 86400
+        return days / self.HALF_LIFE_DAYS
+
+    def decay_factor(self, at: Optional[datetime] = None) -> float:
+        """Multiplier turning stored edge weights into weights decayed to `at`."""
+        return 0.5 ** self._half_lives(at or datetime.utcnow())
+
+    def _rebase_decay(self, epoch: datetime):
+        """Move the decay epoch, rescaling stored weights to match."""
+        factor = 0.5 ** self._half_lives(epoch)
+        self.store.scale(factor)
+        self._out_weight = {a: w * factor for a, w in self._out_weight.items()}
+        self.decay_epoch = epoch
+
+    def edge_weight(
+        self, from_agent: str, to_agent: str, at: Optional[datetime] = None
+    ) -> float:
+        """Weight of an edge with every interaction decayed to `at` (default now)."""
+        with self._lock:
+            self._drain()
+            return self.store.row(from_agent).get(to_agent, 0) * self.decay_factor(at)
+
+    def decayed_adjacency(self, at: Optional[datetime] = None):
+        """Node list and adjacency matrix with weights decayed to `at`.
+
+        PageRank normalizes each row by its out-weight, so the shared
+        decay factor cancels out and scores are computed straight from
+        the stored weights; this is for consumers of absolute weights.
+        """
+        with self._lock:
+            self._drain()
+            nodes, adjacency = self.store.adjacency()
+            return nodes, adjacency * self.decay_factor(at)
     
-    def compute_scores(self) -> Dict[str, float]:
-        """Compute PageRank scores."""
-        if len(self.graph) == 0:
+    def export_state(self) -> dict:
+        """Copy of the edge table (stored weights) for persistence."""
+        with self._lock:
+            _, interaction_count = self._drain()
+            nodes, adjacency = self.store.adjacency()
+            coo = adjacency.tocoo()
+            return {
+                "nodes": nodes,
+                "src": coo.row.astype(np.int32),
+                "dst": coo.col.astype(np.int32),
+                "weight": coo.data.astype(np.float64),
+                "decay_epoch": self.decay_epoch,
+                "interaction_count": interaction_count,
+            }
+
+    def restore_state(
+        self,
+        nodes: List[str],
+        src: np.ndarray,
+        dst: np.ndarray,
+        weight: np.ndarray,
+        decay_epoch: datetime,
+        interaction_count: int,
+    ):
+        """Replace the graph with an edge table from `export_state`."""
+        with self._lock, self._buffer_lock:
+            self._write_buffer = []
+            self.store.clear()
+            self.store.load(nodes, src, dst, weight)
+            self.decay_epoch = decay_epoch
+            self.interaction_count = interaction_count
+            self._rank = {}
+            self._out_weight = {}
+            self._changed_rows = {}
+            self._needs_global = True
+            self._residual = {}
+            self._dropped_mass = 0.0
+            self._transition = None
+            self.version += 1
+
+    def snapshot(self) -> ScoreSnapshot:
+        """Return the score snapshot for the current graph version.
+
+        PageRank is only recomputed when the graph changed since the
+        last snapshot was taken. Writes keep landing in the write buffer
+        while it runs.
+        """
+        snap = self._snapshot
+        if snap is None or snap.version != self.version:
+            with self._lock:
+                snap = self._snapshot
+                if snap is None or snap.version != self.version:
+                    version, interactions = self._drain()
+                    started = time.perf_counter()
+                    if self.incremental:
+                        scores, method = self._incremental_pagerank()
+                    else:
+                        scores, method = self._pagerank(), "full"
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    snap = ScoreSnapshot(scores, version, elapsed_ms, method)
+                    self._snapshot = snap
+                    self._snapshot_interactions = interactions
+        return snap
+
+    def latest_snapshot(self) -> ScoreSnapshot:
+        """Return the last computed snapshot, even if the graph moved on.
+
+        Only computes when no snapshot exists yet.
+        """
+        return self._snapshot or self.snapshot()
+
+    @property
+    def pending_edges(self) -> int:
+        """Interactions added since the last snapshot was computed."""
+        return self.interaction_count - self._snapshot_interactions
+    
+    def _pagerank(self) -> Dict[str, float]:
+        """Run PageRank over the full graph and normalize to 0-1."""
+        if len(self.store) == 0:
             return {}
-        
-        scores = nx.pagerank(
-            self.graph,
-            alpha=self.DAMPING,
-            weight='weight'
+
+        if self.workers and not hasattr(self.store, "propagate"):
+            nodes, x = self._offloaded_power_iteration()
+            scores = dict(zip(nodes, x.tolist()))
+        elif self.store.name == "networkx":
+            scores = nx.pagerank(
+                self.store.graph,
+                alpha=self.DAMPING,
+                weight='weight'
+            )
+        else:
+            nodes, x, _ = self._power_iteration()
+            scores = dict(zip(nodes, x.tolist()))
+
+        return self._normalize(scores)
+
+    def _offloaded_power_iteration(self) -> Tuple[List[str], np.ndarray]:
+        """Power iteration in the process pool; only CSR arrays cross over."""
+        nodes, adjacency = self.store.adjacency()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        future = self._pool.submit(
+            _pagerank_worker,
+            len(nodes),
+            adjacency.indptr,
+            adjacency.indices,
+            adjacency.data,
+            self.DAMPING,
         )
-        
-        # Normalize to 0-1
+        x, self.last_iterations = future.result()
+        return nodes, x
+
+    def close(self):
+        """Shut down the PageRank process pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @staticmethod
+    def _normalize(scores: Dict[str, float]) -> Dict[str, float]:
+        """Normalize to 0-1."""
         max_score = max(scores.values()) if scores else 1
         return {a: s / max_score for a, s in scores.items()}
+
+    def _power_iteration(
+        self, nstart: Optional[Dict[str, float]] = None, tol: float = 1.0e-06
+    ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Power iteration on whatever the store offers.
+
+        Streams over the edge table when the store supports it, otherwise
+        builds the adjacency matrix. Returns nodes, the stationary
+        vector and out-weights, all in node order.
+        """
+        if hasattr(self.store, "propagate"):
+            nodes = self.store.nodes()
+            start = self._start_vector(nodes, nstart)
+            x, self.last_iterations = streamed_power_iteration(
+                self.store, self.DAMPING, start, tol=tol
+            )
+            return nodes, x, self.store.out_weight()
+
+        nodes, adjacency = self.store.adjacency()
+        start = self._start_vector(nodes, nstart)
+        x, self.last_iterations = power_iteration(adjacency, self.DAMPING, start, tol=tol)
+        return nodes, x, np.asarray(adjacency.sum(axis=1)).ravel()
+
+    def _start_vector(self, nodes: List[str], rank: Optional[Dict[str, float]]):
+        if not rank:
+            return None
+        baseline = (1 - self.DAMPING) / len(nodes)
+        return np.array([rank.get(n, baseline) for n in nodes])
+
+    def _track_row_change(self, from_agent: str, to_agent: str, weight: float):
+        """Remember the out-edges of `from_agent` as of the last snapshot."""
+        if not self.store.local_updates:
+            # Reading a row would scan the whole store; warm-start instead.
+            self._needs_global = True
+            return
+        if from_agent not in self._rank or to_agent not in self._rank:
+            # New agents change N, and with it every node's teleport share.
+            self._needs_global = True
+        if self._out_weight.get(from_agent, 0) == 0:
+            # A dangling node gaining its first edge stops spreading its
+            # rank uniformly, which also touches every node.
+            self._needs_global = True
+        if not self._needs_global and from_agent not in self._changed_rows:
+            self._changed_rows[from_agent] = self.store.row(from_agent)
+        self._out_weight[from_agent] = self._out_weight.get(from_agent, 0) + weight
+
+    def _incremental_pagerank(self) -> Tuple[Dict[str, float], str]:
+        """Update the previous stationary vector instead of starting over."""
+        if len(self.store) == 0:
+            return {}, "full"
+        self.store.compact()
+        method = "push"
+        if self._needs_global or not self._forward_push():
+            method = "warm" if self._rank else "full"
+            self._warm_start()
+        self._changed_rows = {}
+        self._needs_global = False
+        return self._normalize(self._rank), method
+
+    def _warm_start(self):
+        """Power iteration seeded with the previous stationary vector."""
+        # Residuals push did not get to are the best guess at where the
+        # rank still has to go; start from there.
+        for v, r in self._residual.items():
+            if v in self._rank:
+                self._rank[v] += r
+        # Converge to TOLERANCE over the whole vector, not per node: a
+        # change confined to a few nodes moves the total by less than that.
+        tol = self.TOLERANCE / len(self.store)
+        nodes, x, out_weight = self._power_iteration(self._rank, tol=tol)
+        self.last_pushes = 0
+        self._rank = dict(zip(nodes, x.tolist()))
+        self._out_weight = dict(zip(nodes, out_weight.tolist()))
+        self._residual = {}
+        self._dropped_mass = 0.0
+
+    def _forward_push(self) -> bool:
+        """Absorb changed out-edge rows with signed forward push.
+
+        Changing row u of the transition matrix leaves a residual of
+        alpha * rank[u] * (new_row - old_row); pushing it through the
+        graph only touches nodes reachable from u while the residual is
+        above TOLERANCE. Residuals left below it are kept for the next
+        push. Returns False when the update is not local after all (more
+        pushes than nodes) or the dangling mass dropped since the last
+        warm start passes MAX_PUSH_DRIFT.
+        """
+        alpha = self.DAMPING
+        rank = self._rank
+        residual = self._residual
+        for u, old_row in self._changed_rows.items():
+            new_row = self.store.row(u)
+            old_total = sum(old_row.values())
+            new_total = self._out_weight[u]
+            mass = alpha * rank[u]
+            for v in set(old_row) | set(new_row):
+                delta = new_row.get(v, 0) / new_total - old_row.get(v, 0) / old_total
+                if delta:
+                    residual[v] = residual.get(v, 0) + mass * delta
+
+        queue = deque(v for v, r in residual.items() if abs(r) > self.TOLERANCE)
+        pushes = 0
+        budget = len(rank)
+        while queue:
+            if pushes > budget:
+                self.last_pushes = pushes
+                return False
+            v = queue.popleft()
+            r = residual.get(v, 0)
+            if abs(r) <= self.TOLERANCE:
+                continue
+            del residual[v]
+            rank[v] += r
+            pushes += 1
+            total = self._out_weight.get(v, 0)
+            if total == 0:
+                self._dropped_mass += abs(alpha * r)
+                continue
+            share = alpha * r / total
+            for w, weight in self.store.row(v).items():
+                before = residual.get(w, 0)
+                after = before + share * weight
+                residual[w] = after
+                if abs(before) <= self.TOLERANCE < abs(after):
+                    queue.append(w)
+
+        self.last_pushes = pushes
+        self.last_iterations = 0
+        return self._dropped_mass <= self.MAX_PUSH_DRIFT
+
+    def transition_graph(self) -> TransitionGraph:
+        """Transition matrix for personalized queries.
+
+        Rebuilt by the first query that finds it older than the latest
+        score snapshot, so queries see at least that snapshot's graph
+        and neither writes nor recomputes pay for it.
+        """
+        snap, cached = self._snapshot, self._transition
+        if cached is not None and (snap is None or cached.version >= snap.version):
+            return cached
+        with self._lock:
+            snap, cached = self._snapshot, self._transition
+            if cached is None or (snap is not None and cached.version < snap.version):
+                version, _ = self._drain()
+                self._transition = self._build_transition(version, cached)
+            return self._transition
+
+    def _build_transition(
+        self, version: int, previous: Optional[TransitionGraph] = None
+    ) -> TransitionGraph:
+        """Transition matrix of the store as it is; caller holds _lock.
+
+        Stores only ever append nodes, so the node index of `previous`
+        is copied and extended rather than rebuilt.
+        """
+        nodes, adjacency = self.store.adjacency()
+        adjacency = sp.csr_array(adjacency)
+        adjacency.sum_duplicates()
+        out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+        probs = adjacency.data / np.repeat(out_weight, np.diff(adjacency.indptr))
+        known = len(previous.nodes) if previous is not None else 0
+        if known and known <= len(nodes) and previous.nodes[known - 1] == nodes[known - 1]:
+            index = previous.index.copy()
+        else:
+            index, known = {}, 0
+        index.update((nodes[i], i) for i in range(known, len(nodes)))
+        return TransitionGraph(version, nodes, index, adjacency.indptr, adjacency.indices, probs)
+
+    def personalized_scores(
+        self, seeds: Iterable[str], epsilon: float = 1.0e-4
+    ) -> Optional[Tuple[Dict[str, float], int]]:
+        """Personalized PageRank from the seed agents' point of view.
+
+        Returns raw scores (summing to about 1, unknown seeds ignored)
+        and the number of pushes it took, or None if no seed is in the
+        graph.
+        """
+        graph = self.transition_graph()
+        seed_ids = sorted({graph.index[s] for s in seeds if s in graph.index})
+        if not seed_ids:
+            return None
+        rank, pushes = personalized_push(graph, seed_ids, self.DAMPING, epsilon)
+        return {graph.nodes[i]: score for i, score in rank.items()}, pushes
+
+    @property
+    def graph(self) -> nx.DiGraph:
+        """The interaction graph as an `nx.DiGraph`.
+
+        Built on demand (and not kept in sync) for non-NetworkX backends.
+        """
+        with self._lock:
+            self._drain()
+            return self.store.to_networkx()
+
+    def agent_count(self) -> int:
+        """Number of agents in the graph, including buffered writes."""
+        with self._lock:
+            self._drain()
+            return len(self.store)
+
+    def compute_scores(self) -> Dict[str, float]:
+        """Compute PageRank scores (cached per graph version; do not mutate)."""
+        return self.snapshot().scores
     
     def get_top_agents(self, n: int = 10) -> List[Tuple[str, float]]:
         """Return top N agents."""
-        scores = self.compute_scores()
-        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:n]
+        return self.snapshot().top(n)
     
     def get_score(self, agent: str) -> float:
         """Get score for one agent."""
         return self.compute_scores().get(agent.lower(), 0)
+
+
+class MonteCarloPageRank(DignitasPageRank):
+    """PageRank estimated from stored random walks (Bahmani et al.).
+
+    Every agent keeps `walks_per_node` walks starting at it; a walk
+    follows a weighted out-edge with probability DAMPING and stops
+    otherwise, or at a dangling agent. Scores are visit counts. When an
+    agent's out-edges change, only the walks passing through it are
+    resampled, from their first visit on; all other walks stay valid.
+    """
+
+    def __init__(
+        self,
+        walks_per_node: int = 16,
+        seed: Optional[int] = None,
+        backend: str = "networkx",
+        **store_options,
+    ):
+        super().__init__(backend=backend, **store_options)
+        self.walks_per_node = walks_per_node
+        self._rng = random.Random(seed)
+        # Agents by id, their out-edges (mirroring the store's stored
+        # weights) and cumulative weights for sampling, built lazily.
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._out: List[Dict[int, float]] = []
+        self._cumulative: Dict[int, Tuple[List[int], List[float]]] = {}
+        # Walks of agent i are _walks[i * walks_per_node:(i + 1) * walks_per_node]
+        self._walks: List[List[int]] = []
+        self._walks_through: List[Set[int]] = []
+        self._visits: List[int] = []
+        self.last_resampled = 0
+
+    def _node_id(self, agent: str) -> int:
+        node = self._ids.get(agent)
+        if node is None:
+            node = self._ids[agent] = len(self._names)
+            self._names.append(agent)
+            self._out.append({})
+            self._walks_through.append(set())
+            self._visits.append(0)
+        return node
+
+    def _step(self, node: int) -> int:
+        """A weighted random out-neighbor of `node`."""
+        cumulative = self._cumulative.get(node)
+        if cumulative is None:
+            out = self._out[node]
+            cumulative = self._cumulative[node] = (list(out), list(accumulate(out.values())))
+        targets, weights = cumulative
+        i = bisect.bisect_right(weights, self._rng.random() * weights[-1])
+        return targets[min(i, len(targets) - 1)]
+
+    def _walk(self, node: int) -> List[int]:
+        walk = [node]
+        while self._out[node] and self._rng.random() < self.DAMPING:
+            node = self._step(node)
+            walk.append(node)
+        return walk
+
+    def _record(self, walk_id: int, nodes: List[int], delta: int):
+        for node in nodes:
+            self._visits[node] += delta
+        for node in set(nodes):
+            if delta > 0:
+                self._walks_through[node].add(walk_id)
+            else:
+                self._walks_through[node].discard(walk_id)
+
+    def _add_walks(self):
+        """Start walks for agents that do not have them yet."""
+        for node in range(len(self._walks) // self.walks_per_node, len(self._names)):
+            for _ in range(self.walks_per_node):
+                walk = self._walk(node)
+                self._record(len(self._walks), walk, 1)
+                self._walks.append(walk)
+
+    def _resample(self, changed: Set[int]):
+        """Redraw walks from their first visit to an agent in `changed`."""
+        affected = set()
+        for node in changed:
+            affected |= self._walks_through[node]
+        for walk_id in affected:
+            walk = self._walks[walk_id]
+            first = next(i for i, node in enumerate(walk) if node in changed)
+            head = walk[: first + 1]
+            self._record(walk_id, walk, -1)
+            walk = head + self._walk(walk[first])[1:]
+            self._record(walk_id, walk, 1)
+            self._walks[walk_id] = walk
+        self.last_resampled = len(affected)
+
+    def _write_rows(self, rows: List[Tuple[str, str, float, str, datetime]]):
+        super()._write_rows(rows)
+        changed = set()
+        for from_agent, to_agent, weight, _, _ in rows:
+            src, dst = self._node_id(from_agent), self._node_id(to_agent)
+            self._out[src][dst] = self._out[src].get(dst, 0.0) + weight
+            changed.add(src)
+        for node in changed:
+            self._cumulative.pop(node, None)
+        self._resample(changed)
+        self._add_walks()
+
+    def _rebase_decay(self, epoch: datetime):
+        factor = 0.5 ** self._half_lives(epoch)
+        super()._rebase_decay(epoch)
+        for out in self._out:
+            for dst in out:
+                out[dst] *= factor
+        self._cumulative = {}
+
+    def restore_state(
+        self,
+        nodes: List[str],
+        src: np.ndarray,
+        dst: np.ndarray,
+        weight: np.ndarray,
+        decay_epoch: datetime,
+        interaction_count: int,
+    ):
+        with self._lock:
+            super().restore_state(nodes, src, dst, weight, decay_epoch, interaction_count)
+            self._ids, self._names, self._out, self._cumulative = {}, [], [], {}
+            self._walks, self._walks_through, self._visits = [], [], []
+            for node in nodes:
+                self._node_id(node)
+            for u, v, w in zip(src.tolist(), dst.tolist(), weight.tolist()):
+                self._out[u][v] = self._out[u].get(v, 0.0) + w
+            self._add_walks()
+
+    def _pagerank(self) -> Dict[str, float]:
+        """Visit counts of the stored walks, normalized to 0-1."""
+        return self._normalize(dict(zip(self._names, self._visits)))
+
+    def personalized_scores(
+        self, seeds: Iterable[str], epsilon: float = 1.0e-4
+    ) -> Optional[Tuple[Dict[str, float], int]]:
+        """Personalized PageRank by stitching stored walks.
+
+        Follows one walk that restarts at a seed whenever it stops, for
+        about 1/epsilon visits. At each agent it replays that agent's
+        stored walks first, each at most once, and only draws fresh
+        steps after they run out. Returns visit frequencies and the
+        number of fresh steps (0 when the stored walks suffice), or
+        None if no seed is in the graph.
+        """
+        with self._lock:
+            self._drain()
+            seed_ids = sorted({self._ids[s] for s in seeds if s in self._ids})
+            if not seed_ids:
+                return None
+            budget = math.ceil(1 / epsilon)
+            visits: Dict[int, int] = {}
+            used: Dict[int, int] = {}
+            total = steps = 0
+            node = self._rng.choice(seed_ids)
+            while total < budget:
+                k = used.get(node, 0)
+                if k < self.walks_per_node:
+                    used[node] = k + 1
+                    walk = self._walks[node * self.walks_per_node + k]
+                    for v in walk:
+                        visits[v] = visits.get(v, 0) + 1
+                    total += len(walk)
+                    node = self._rng.choice(seed_ids)
+                    continue
+                visits[node] = visits.get(node, 0) + 1
+                total += 1
+                steps += 1
+                if self._out[node] and self._rng.random() < self.DAMPING:
+                    node = self._step(node)
+                else:
+                    node = self._rng.choice(seed_ids)
+            return {self._names[v]: count / total for v, count in visits.items()}, steps
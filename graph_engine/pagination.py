@@ -0,0 +1,152 @@
+import base64
+import json
+from bisect import bisect_right
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from records import SPEC_FIELDS, dumps
+
+ORDERS = ("score", "address")
+SCORE_ROW_FIELDS = ("address", "score", "rank")
+SPEC_ROW_FIELDS = ("address",) + SPEC_FIELDS + ("ens_name",)
+ROW_FIELDS = SCORE_ROW_FIELDS + SPEC_ROW_FIELDS[1:]
+NDJSON_CHUNK_ROWS = 1000  # Rows encoded per chunk of a streamed body
+
+
+def parse_fields(fields: Optional[str], default: Sequence[str]) -> Tuple[str, ...]:
+    """`fields=name,score` to a tuple of row fields; ValueError on unknown ones."""
+    if not fields:
+        return tuple(default)
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in ROW_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(ROW_FIELDS)})")
+    return names
+
+
+def decode_cursor(cursor: str, order: str) -> dict:
+    """Inverse of Listing.cursor(); ValueError if malformed or for another order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(state, dict) or not isinstance(state["i"], int):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Malformed cursor")
+    if state.get("o") != order:
+        raise ValueError(f"Cursor was issued for order={state.get('o')}")
+    return state
+
+
+class Listing:
+    """A fixed ordering of agents that pages are sliced from.
+
+    `scores` (descending) is given for score order and None for address
+    order, where `addresses` is sorted. Cursors carry the position to
+    resume from plus the last agent returned, so a cursor from an older
+    listing resumes after that agent's address, or its score, instead of
+    at a position that no longer means the same thing.
+    """
+
+    def __init__(self, version: str, addresses: List[str], scores: Optional[np.ndarray] = None):
+        self.version = version
+        self.addresses = addresses
+        self.scores = scores
+        self.order = "address" if scores is None else "score"
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def start(self, state: Optional[dict]) -> int:
+        """Position to resume from for a decoded cursor (0 without one)."""
+        if state is None:
+            return 0
+        if state.get("v") == self.version:
+            return min(max(state["i"], 0), len(self))
+        last = str(state.get("a", ""))
+        if self.scores is None:
+            return bisect_right(self.addresses, last)
+        # Agents tied on score are in no particular order: resume after the
+        # last agent if it is still in its tie block, else after the block.
+        keys = -self.scores
+        score = float(state.get("s", 0.0))
+        lo = int(np.searchsorted(keys, -score, side="left"))
+        hi = int(np.searchsorted(keys, -score, side="right"))
+        for i in range(lo, hi):
+            if self.addresses[i] == last:
+                return i + 1
+        return hi
+
+    def cursor(self, end: int) -> Optional[str]:
+        """Opaque cursor for the page after position `end`, or None at the end."""
+        if end >= len(self) or end <= 0:
+            return None
+        state = {"o": self.order, "v": self.version, "i": end, "a": self.addresses[end - 1]}
+        if self.scores is not None:
+            state["s"] = float(self.scores[end - 1])
+        return base64.urlsafe_b64encode(dumps(state)).decode().rstrip("=")
+
+
+class Listings:
+    """The current Listing per (kind, order), rebuilt when its version changes."""
+
+    def __init__(self):
+        self._listings: Dict[Tuple[str, str], Listing] = {}
+
+    def get(self, kind: str, order: str, version: str, build: Callable[[], Listing]) -> Listing:
+        listing = self._listings.get((kind, order))
+        if listing is None or listing.version != version:
+            listing = build()
+            self._listings[(kind, order)] = listing
+        return listing
+
+
+def scores_listing(snap, order: str) -> Listing:
+    """Every scored agent, by rank or by address."""
+    if order == "score":
+        return Listing(str(snap.version), snap.ranked_agents, snap.ranked_scores)
+    return Listing(str(snap.version), sorted(snap.ranked_agents))
+
+
+def specs_listing(specs: Dict[str, dict], specs_version: int, snap, order: str) -> Listing:
+    """Every registered agent, by address, or by score with unscored agents last."""
+    if order == "address":
+        return Listing(str(specs_version), sorted(specs))
+    ranked = [a for a in snap.ranked_agents if a in specs]
+    unranked = sorted(a for a in specs if a not in snap.scores)
+    scores = np.zeros(len(ranked) + len(unranked))
+    scores[: len(ranked)] = [snap.scores[a] for a in ranked]
+    return Listing(f"{specs_version}.{snap.version}", ranked + unranked, scores)
+
+
+def rows(
+    addresses: Sequence[str], fields: Tuple[str, ...], snap, specs: Dict[str, dict]
+) -> Iterator[dict]:
+    """Projected `{field: value}` rows for `addresses`."""
+    with_spec = any(f in SPEC_ROW_FIELDS[1:] for f in fields)
+    for address in addresses:
+        spec = (specs.get(address) or {}) if with_spec else None
+        row = {}
+        for field in fields:
+            if field == "address":
+                row["address"] = address
+            elif field == "score":
+                row["score"] = round(snap.scores.get(address, 0.0), 4)
+            elif field == "rank":
+                row["rank"] = snap.rank(address)
+            else:
+                row[field] = spec.get(field)
+        yield row
+
+
+def ndjson(records: Iterator[dict]) -> Iterator[bytes]:
+    """Newline-delimited JSON body, encoded NDJSON_CHUNK_ROWS rows at a time."""
+    chunk = []
+    for row in records:
+        chunk.append(dumps(row))
+        if len(chunk) == NDJSON_CHUNK_ROWS:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
@@ -0,0 +1,112 @@
+import json
+from typing import Dict, Iterable, List, Tuple
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+# Spec fields copied into leaderboard/discover entries, and the shorter
+# summary used by smart discovery.
+SPEC_FIELDS = ("name", "description", "capabilities", "tags", "category")
+SUMMARY_FIELDS = ("name", "description", "category")
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps`."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class AgentRecords:
+    """Pre-serialized agent entries for leaderboard and discovery responses.
+
+    Each agent's spec fields are kept as a JSON fragment until its spec
+    changes, and each (address, score, spec) entry as complete JSON
+    bytes until the score snapshot changes, so a response is assembled
+    by joining cached bytes.
+    """
+
+    def __init__(self, relevancy_engine):
+        self.relevancy_engine = relevancy_engine
+        self._fragments: Dict[Tuple[str, bool], Tuple[int, bytes]] = {}
+        # (snapshot, {address: (spec version, entry)}), replaced whole on
+        # a new snapshot so a request never writes into another's dict
+        self._entries: Tuple[object, Dict[str, Tuple[int, bytes]]] = (None, {})
+        self.hits = 0
+        self.misses = 0
+
+    def fragment(self, address: str, summary: bool = False) -> bytes:
+        """`,"name":...` spec fields to splice into an entry (b"" without a spec)."""
+        version = self.relevancy_engine.spec_versions.get(address, 0)
+        cached = self._fragments.get((address, summary))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        spec = self.relevancy_engine.get_agent_spec(address)
+        if spec is None:
+            fragment = b""
+        else:
+            fields = {f: spec.get(f) for f in (SUMMARY_FIELDS if summary else SPEC_FIELDS)}
+            if not summary and spec.get("ens_name"):
+                fields["ens_name"] = spec["ens_name"]
+            fragment = b"," + dumps(fields)[1:-1]
+        self._fragments[(address, summary)] = (version, fragment)
+        return fragment
+
+    def entry(self, snap, address: str, score: float) -> bytes:
+        """`{"address", "score", spec fields}` for the agent in `snap`."""
+        return self._entry(self._entries_for(snap), address, score)
+
+    def _entries_for(self, snap) -> Dict[str, Tuple[int, bytes]]:
+        """The entry dict of `snap`; uncached for a snapshot older than the current one."""
+        current, entries = self._entries
+        if current is snap:
+            return entries
+        if current is not None and snap.version < current.version:
+            return {}
+        entries = {}
+        self._entries = (snap, entries)
+        return entries
+
+    def _entry(self, entries: Dict[str, Tuple[int, bytes]], address: str, score: float) -> bytes:
+        version = self.relevancy_engine.spec_versions.get(address, 0)
+        cached = entries.get(address)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        entry = self.with_fields({"address": address, "score": round(score, 4)})
+        entries[address] = (version, entry)
+        return entry
+
+    def entries(self, snap, ranked: Iterable[Tuple[str, float]]) -> List[bytes]:
+        entries = self._entries_for(snap)
+        return [self._entry(entries, address, score) for address, score in ranked]
+
+    def with_fields(self, fields: dict, summary: bool = False) -> bytes:
+        """Entry for per-request `fields` (which include "address") plus spec fields."""
+        return dumps(fields)[:-1] + self.fragment(fields["address"], summary) + b"}"
+
+    @staticmethod
+    def response(entries: List[bytes], **fields) -> bytes:
+        """`{"agents": [entries...], **fields}` as JSON bytes."""
+        tail = b"," + dumps(fields)[1:] if fields else b"}"
+        return b'{"agents":[' + b",".join(entries) + b"]" + tail
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries[1]),
+            "fragments": len(self._fragments),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
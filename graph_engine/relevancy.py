@@ -1,28 +1,59 @@
 import os
-import json
 import asyncio
-import google.generativeai as genai
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from llm_providers import provider_from_env
+from relevancy_cache import RelevancyCache, normalize_query
+from spec_index import FacetIndex, SpecIndex
 
 
 class RelevancyEngine:
-    """LLM-based relevancy scoring using Gemini 2.5 Flash."""
+    """Relevancy scoring: a local BM25 prefilter, reranked by an LLM provider."""
 
-    def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel("gemini-2.5-flash")
-        else:
-            self.model = None
-            print("Warning: GEMINI_API_KEY not set, relevancy scoring disabled")
+    def __init__(self, provider=None):
+        # Gemini 2.5 Flash by default; see llm_providers.provider_from_env
+        self.provider = provider if provider is not None else provider_from_env()
+        if self.provider is None:
+            print("Warning: no LLM provider configured, using local spec index for relevancy")
 
         # Agent specifications storage (in production, use a database)
         self.agent_specs: Dict[str, dict] = {}
+        # Bumped whenever an agent's spec changes; part of the cache key
+        self.spec_versions: Dict[str, int] = {}
+        # Bumped on any spec change, for publishing specs to read workers
+        self.specs_version = 0
+
+        # Local lexical index over specs; the LLM only reranks its top K
+        self.index = SpecIndex()
+        self.rerank_top_k = int(os.getenv("RELEVANCY_RERANK_TOP_K", "20"))
+        # LLM calls: chunked, with a shared concurrency limit
+        self.chunk_size = int(os.getenv("RELEVANCY_CHUNK_SIZE", "10"))
+        self.chunk_timeout_s = float(os.getenv("RELEVANCY_CHUNK_TIMEOUT_S", "25"))
+        self.max_concurrency = int(os.getenv("RELEVANCY_MAX_CONCURRENCY", "4"))
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        self._llm_slots_loop = None
+        self._background: Set[asyncio.Task] = set()
+
+        # Category / tag / capability filters
+        self.facets = FacetIndex()
+
+        # (snapshot, PageRank scores aligned with index ids), replaced as
+        # one tuple so concurrent readers never pair mismatched halves
+        self._pagerank_by_id: Optional[Tuple[object, np.ndarray]] = None
+        self._lookups_snapshot = None
+        self._lookups = 0
+
+        self.cache = RelevancyCache(
+            max_entries=int(os.getenv("RELEVANCY_CACHE_SIZE", "10000")),
+            ttl_s=float(os.getenv("RELEVANCY_CACHE_TTL_S", "600")),
+        )
 
     def register_agent(self, address: str, spec: dict):
         """Register or update an agent's specification."""
-        self.agent_specs[address.lower()] = {
+        address = address.lower()
+        normalized = {
             "name": spec.get("name", "Unknown Agent"),
             "description": spec.get("description", ""),
             "capabilities": spec.get("capabilities", []),
@@ -30,6 +61,14 @@ class RelevancyEngine:
             "category": spec.get("category", "general"),
             "ens_name": spec.get("ens_name"),
         }
+        if self.agent_specs.get(address) == normalized:
+            return
+        self.spec_versions[address] = self.spec_versions.get(address, 0) + 1
+        self.cache.invalidate_agent(address)
+        self.index.add(address, normalized)
+        self.facets.add(address, normalized)
+        self.agent_specs[address] = normalized
+        self.specs_version += 1
 
     def get_agent_spec(self, address: str) -> Optional[dict]:
         """Get agent specification."""
@@ -39,18 +78,230 @@ class RelevancyEngine:
         """Get all agent specifications."""
         return self.agent_specs
 
-    async def compute_relevancy(self, query: str, agents: List[dict]) -> List[dict]:
+    def filter_agents(
+        self,
+        category: Optional[str] = None,
+        tags: Iterable[str] = (),
+        capabilities: Iterable[str] = (),
+    ) -> Optional[Set[str]]:
+        """Addresses matching all given facets, or None if unfiltered."""
+        return self.facets.filter(category, tags, capabilities)
+
+    def _pagerank_of(self, snap, ids: np.ndarray) -> np.ndarray:
+        """PageRank of indexed agents by id; NaN if unranked.
+
+        Kept as an array over all ids per snapshot. Building it costs a
+        lookup per agent, so for a new snapshot ids are looked up one by
+        one until that adds up to as many lookups as the build.
+        """
+        entry, size = self._pagerank_by_id, len(self.index.addresses)
+        cached = entry[1] if entry is not None and entry[0] is snap else None
+        if cached is None:
+            if self._lookups_snapshot is not snap:
+                self._lookups_snapshot, self._lookups = snap, 0
+            self._lookups += len(ids)
+            if self._lookups < size:
+                addresses, scores = self.index.addresses, snap.scores
+                return np.fromiter(
+                    (scores.get(addresses[i], np.nan) for i in ids.tolist()), float, len(ids)
+                )
+            cached = np.empty(0)
+        if len(cached) < size:
+            tail = self.index.addresses[len(cached) : size]
+            cached = np.concatenate(
+                [cached, np.fromiter((snap.scores.get(a, np.nan) for a in tail), float, len(tail))]
+            )
+            self._pagerank_by_id = (snap, cached)
+        return cached[ids]
+
+    def candidates(
+        self,
+        query: Optional[str],
+        snap,
+        depth: int,
+        min_score: float = 0,
+        category: Optional[str] = None,
+        tags: Iterable[str] = (),
+        capabilities: Iterable[str] = (),
+        pagerank_weight: float = 0.4,
+        relevancy_weight: float = 0.6,
+    ) -> List[Tuple[str, float, float]]:
+        """First, cheap stage of discovery, over every agent in `snap`.
+
+        Keeps agents matching the facets with PageRank >= `min_score`
+        and returns the `depth` best by combined PageRank and spec index
+        score, as (address, pagerank, index score), best first. Text
+        matches are scored with numpy over whole postings; agents not
+        matching the query compete on PageRank alone.
+        """
+        allowed = self.filter_agents(category, tags, capabilities)
+        if allowed is None:
+            by_rank = snap.above(min_score, depth)
+        else:
+            by_rank = snap.above_among(allowed, min_score, depth)
+        if not query or depth <= 0:
+            return [(a, s, 0.0) for a, s in by_rank]
+
+        matched, text = self.index.score_matches(query)
+        if allowed is not None:
+            # Walk whichever side is smaller
+            if len(allowed) < len(matched):
+                ids = self.index.ids
+                allowed_ids = np.fromiter((ids[a] for a in allowed if a in ids), dtype=np.int64)
+                keep = np.isin(matched, allowed_ids)
+            else:
+                addresses = self.index.addresses
+                keep = np.array([addresses[i] in allowed for i in matched.tolist()], dtype=bool)
+            matched, text = matched[keep], text[keep]
+        pagerank = self._pagerank_of(snap, matched)
+        with np.errstate(invalid="ignore"):
+            keep = pagerank >= min_score
+        matched, pagerank, text = matched[keep], pagerank[keep], text[keep]
+        combined = pagerank * pagerank_weight + text * relevancy_weight
+        if len(matched) > depth:
+            best = np.argpartition(-combined, depth - 1)[:depth]
+            matched, pagerank, text, combined = (
+                matched[best], pagerank[best], text[best], combined[best]
+            )
+
+        # The best non-matching agents are the best by PageRank alone
+        found = {
+            self.index.addresses[i]: (p, t, c)
+            for i, p, t, c in zip(
+                matched.tolist(), pagerank.tolist(), text.tolist(), combined.tolist()
+            )
+        }
+        for address, score in by_rank:
+            if address not in found:
+                found[address] = (score, 0.0, score * pagerank_weight)
+        ranked = sorted(found.items(), key=lambda x: x[1][2], reverse=True)[:depth]
+        return [(address, p, t) for address, (p, t, _) in ranked]
+
+    async def compute_relevancy(
+        self, query: str, agents: List[dict], deadline: Optional[float] = None
+    ) -> List[dict]:
         """
         Compute relevancy scores for agents based on user query.
-        Returns agents with added 'relevancy_score' field.
+        Returns agents with added 'relevancy_score' and 'relevancy_source'
+        ("llm", "cache" or "index") fields.
+
+        Candidates are ranked by the local spec index first; only the
+        top `rerank_top_k` are sent to the LLM, in chunks of `chunk_size`
+        scored concurrently. Chunks not back within `deadline` seconds
+        keep their index scores (and still fill the cache when they land).
+        Once any agent has an LLM score, index scores are scaled to rank
+        below the lowest of them.
         """
-        if not self.model or not query:
-            # No LLM available or no query, return agents as-is with 1.0 relevancy
+        if not query:
+            # No query, return agents as-is with 1.0 relevancy
             for agent in agents:
                 agent["relevancy_score"] = 1.0
             return agents
 
-        # Build agent info for the prompt
+        lexical = self.index.search(query, [agent["address"] for agent in agents])
+        for agent in agents:
+            agent["relevancy_score"] = round(lexical.get(agent["address"], 0.0), 4)
+            agent["relevancy_source"] = "index"
+        if self.provider is None:
+            return agents
+
+        ranked = sorted(agents, key=lambda a: lexical.get(a["address"], 0.0), reverse=True)
+
+        # Only ask the LLM about agents without a cached score
+        normalized = normalize_query(query)
+        missing = []
+        for agent in ranked[: self.rerank_top_k]:
+            addr = agent["address"]
+            cached = self.cache.get(normalized, addr, self.spec_versions.get(addr, 0))
+            if cached is None:
+                missing.append(agent)
+            else:
+                agent["relevancy_score"] = cached
+                agent["relevancy_source"] = "cache"
+        if missing:
+            await self._rerank(query, normalized, missing, deadline)
+        self._below_reranked(agents, lexical)
+        return agents
+
+    async def _rerank(
+        self, query: str, normalized: str, missing: List[dict], deadline: Optional[float]
+    ):
+        """LLM-score `missing` in chunks, stopping at `deadline` seconds."""
+        chunks = [
+            missing[i : i + self.chunk_size] for i in range(0, len(missing), self.chunk_size)
+        ]
+        pending = {
+            asyncio.ensure_future(self._score_chunk(query, normalized, chunk)): chunk
+            for chunk in chunks
+        }
+        loop = asyncio.get_running_loop()
+        end = loop.time() + deadline if deadline is not None else None
+        while pending:
+            timeout = max(0.0, end - loop.time()) if end is not None else None
+            done, _ = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                print(f"Relevancy deadline hit with {len(pending)} chunk(s) outstanding")
+                break
+            for task in done:
+                chunk = pending.pop(task)
+                scores = task.result()
+                for agent in chunk:
+                    if agent["address"] in scores:
+                        agent["relevancy_score"] = scores[agent["address"]]
+                        agent["relevancy_source"] = "llm"
+
+        # Let late chunks finish in the background to warm the cache
+        for task in pending:
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    @staticmethod
+    def _below_reranked(agents: List[dict], lexical: Dict[str, float]):
+        """Move index-scored agents onto the LLM scale, below every LLM score.
+
+        Index scores are relative (the best match is 1.0) while LLM scores
+        are absolute, so an unreranked agent could otherwise outrank the
+        reranked head. They are scaled into [0, lowest LLM score].
+        """
+        reranked = [a["relevancy_score"] for a in agents if a["relevancy_source"] != "index"]
+        if not reranked:
+            return
+        floor = min(reranked)
+        for agent in agents:
+            if agent["relevancy_source"] == "index":
+                agent["relevancy_score"] = round(lexical.get(agent["address"], 0.0) * floor, 4)
+
+    def _slots(self) -> asyncio.Semaphore:
+        """Concurrency limit for LLM calls, bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._llm_slots_loop is not loop:
+            self._llm_slots = asyncio.Semaphore(self.max_concurrency)
+            self._llm_slots_loop = loop
+        return self._llm_slots
+
+    async def _score_chunk(self, query: str, normalized: str, chunk: List[dict]) -> Dict[str, float]:
+        """Score one chunk under the concurrency limit; {} if it fails."""
+        async with self._slots():
+            try:
+                scores = await asyncio.wait_for(
+                    self._score_with_llm(query, chunk), timeout=self.chunk_timeout_s
+                )
+            except asyncio.TimeoutError:
+                print("Relevancy scoring timed out for a chunk, using index scores")
+                return {}
+            except Exception as e:
+                print(f"Relevancy scoring error: {e}")
+                return {}
+        for agent in chunk:
+            addr = agent["address"]
+            if addr in scores:
+                self.cache.put(normalized, addr, self.spec_versions.get(addr, 0), scores[addr])
+        return scores
+
+    async def _score_with_llm(self, query: str, agents: List[dict]) -> Dict[str, float]:
+        """Ask the LLM provider for relevancy scores of `agents`, keyed by address."""
         agents_info = []
         for agent in agents:
             addr = agent["address"]
@@ -65,60 +316,7 @@ class RelevancyEngine:
                     "category": spec.get("category", "general"),
                 }
             )
-
-        prompt = f"""You are an AI agent matchmaker. Given a user's request and a list of AI agents with their specifications, rate how relevant each agent is to the request.
-
-USER REQUEST: "{query}"
-
-AGENTS:
-{json.dumps(agents_info, indent=2)}
-
-For each agent, provide a relevancy score from 0.0 to 1.0 where:
-- 1.0 = Perfect match, agent is exactly what the user needs
-- 0.7-0.9 = Good match, agent can likely help
-- 0.4-0.6 = Partial match, some overlap
-- 0.1-0.3 = Weak match, minimal relevance
-- 0.0 = No relevance at all
-
-Respond ONLY with a JSON object mapping agent addresses to their relevancy scores.
-Example: {{"0x1234...": 0.85, "0x5678...": 0.3}}
-"""
-
-        try:
-            import asyncio
-
-            response = await asyncio.wait_for(
-                self.model.generate_content_async(prompt),
-                timeout=25.0,  # 25 second timeout for LLM call
-            )
-            text = response.text.strip()
-
-            # Extract JSON from response
-            if "```json" in text:
-                text = text.split("```json")[1].split("```")[0]
-            elif "```" in text:
-                text = text.split("```")[1].split("```")[0]
-
-            scores = json.loads(text)
-
-            # Apply scores to agents
-            for agent in agents:
-                addr = agent["address"]
-                agent["relevancy_score"] = scores.get(addr, 0.5)
-
-            return agents
-
-        except asyncio.TimeoutError:
-            print("Relevancy scoring timed out, using fallback scores")
-            for agent in agents:
-                agent["relevancy_score"] = 0.5
-            return agents
-        except Exception as e:
-            print(f"Relevancy scoring error: {e}")
-            # Fallback: all agents get neutral relevancy
-            for agent in agents:
-                agent["relevancy_score"] = 0.5
-            return agents
+        return await self.provider.score(query, agents_info)
 
     def compute_combined_score(
         self,
@@ -0,0 +1,85 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+CacheKey = Tuple[str, str, int]
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold and strip punctuation/extra whitespace so trivially
+    different phrasings of a query share cache entries."""
+    return " ".join(re.findall(r"\w+", query.lower()))
+
+
+class RelevancyCache:
+    """LRU + TTL cache of relevancy scores per (query, agent, spec version).
+
+    Entries for an agent can be dropped in one go when its spec changes;
+    the spec version in the key also keeps stale entries from ever
+    being served in between.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_s: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[CacheKey, Tuple[float, float]]" = OrderedDict()
+        self._by_agent: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, query: str, address: str, spec_version: int) -> Optional[float]:
+        key = (query, address, spec_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, query: str, address: str, spec_version: int, score: float):
+        key = (query, address, spec_version)
+        with self._lock:
+            self._entries[key] = (score, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(key)
+            self._by_agent.setdefault(address, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_agent(self, address: str):
+        """Drop every cached score for an agent."""
+        with self._lock:
+            for key in self._by_agent.pop(address, set()):
+                self._entries.pop(key, None)
+                self.invalidations += 1
+
+    def _remove(self, key: CacheKey):
+        self._entries.pop(key, None)
+        keys = self._by_agent.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_agent[key[1]]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from typing import Optional
+
+from pagerank import DignitasPageRank, ScoreSnapshot
+
+
+class RecomputeScheduler:
+    """Background PageRank recompute with stale-while-revalidate reads.
+
+    Writes only mark the graph dirty. A worker thread recomputes scores
+    every `interval_s` seconds, or as soon as `max_pending_edges`
+    interactions have piled up, while readers keep getting the last
+    good snapshot. A snapshot is always served for at least
+    `min_staleness_s` seconds so bursts of writes coalesce into one
+    recompute.
+    """
+
+    def __init__(
+        self,
+        engine: DignitasPageRank,
+        interval_s: float = 2.0,
+        max_pending_edges: int = 100,
+        min_staleness_s: float = 0.5,
+    ):
+        self.engine = engine
+        self.interval_s = interval_s
+        self.max_pending_edges = max_pending_edges
+        self.min_staleness_s = min_staleness_s
+
+        self.last_recompute_ms: Optional[float] = None
+        self.last_recompute_at: Optional[float] = None
+        self.recompute_count = 0
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, engine: DignitasPageRank) -> "RecomputeScheduler":
+        """Build a scheduler configured from RECOMPUTE_* environment variables."""
+        return cls(
+            engine,
+            interval_s=float(os.getenv("RECOMPUTE_INTERVAL_S", "2.0")),
+            max_pending_edges=int(os.getenv("RECOMPUTE_MAX_PENDING_EDGES", "100")),
+            min_staleness_s=float(os.getenv("RECOMPUTE_MIN_STALENESS_S", "0.5")),
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Compute an initial snapshot and start the worker thread."""
+        if self.running:
+            return
+        self.recompute()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="pagerank-recompute", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the worker thread."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify_write(self):
+        """Called after each write; wakes the worker once enough edges are dirty."""
+        if self.engine.pending_edges >= self.max_pending_edges:
+            self._wake.set()
+
+    def snapshot(self) -> ScoreSnapshot:
+        """Snapshot to serve reads from.
+
+        With the worker running this never recomputes on the request
+        path; without it, reads fall back to the engine's own cache.
+        """
+        if self.running:
+            return self.engine.latest_snapshot()
+        return self.engine.snapshot()
+
+    def recompute(self) -> ScoreSnapshot:
+        """Recompute scores now if the graph changed."""
+        started = time.perf_counter()
+        had_pending = self.engine.pending_edges > 0 or self.last_recompute_at is None
+        snap = self.engine.snapshot()
+        if had_pending:
+            self.last_recompute_ms = (time.perf_counter() - started) * 1000
+            self.last_recompute_at = time.time()
+            self.recompute_count += 1
+        return snap
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if self.engine.pending_edges == 0:
+                continue
+
+            snap = self.engine.latest_snapshot()
+            wait = self.min_staleness_s - snap.age_seconds()
+            if wait > 0 and self._stop.wait(wait):
+                break
+
+            try:
+                self.recompute()
+            except Exception as e:
+                print(f"Background PageRank recompute failed: {e}")
+
+    def status(self) -> dict:
+        """Pending work and freshness of the served snapshot."""
+        snap = self.engine.latest_snapshot()
+        return {
+            "running": self.running,
+            "pending_edges": self.engine.pending_edges,
+            "graph_version": self.engine.version,
+            "snapshot_version": snap.version,
+            "snapshot_age_s": round(snap.age_seconds(), 3),
+            "last_recompute_ms": (
+                round(self.last_recompute_ms, 3)
+                if self.last_recompute_ms is not None
+                else None
+            ),
+            "recompute_count": self.recompute_count,
+            "config": {
+                "interval_s": self.interval_s,
+                "max_pending_edges": self.max_pending_edges,
+                "min_staleness_s": self.min_staleness_s,
+            },
+        }
@@ -0,0 +1,228 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+import numpy as np
+
+from pagerank import ScoreSnapshot
+from records import dumps
+
+Message = Tuple[str, str]  # (event name, JSON data)
+
+
+class ScoreDelta:
+    """Per-agent score and rank moves between two snapshots.
+
+    Computed once per recompute and shared by every subscriber; each
+    distinct (thresholds, watch list, limit) message is encoded once.
+    """
+
+    def __init__(self, snap: ScoreSnapshot, previous: ScoreSnapshot):
+        self.snap = snap
+        self.previous = previous
+        self.old_scores, self.old_ranks = snap.changes_since(previous)
+        n = len(snap.ranked_agents)
+        self.score_moves = np.abs(snap.ranked_scores - self.old_scores)
+        # An agent new to the ranking counts as moving the whole ranking
+        self.rank_moves = np.where(
+            self.old_ranks > 0, np.abs(self.old_ranks - np.arange(1, n + 1)), n
+        )
+        # Positions sorted by move size, biggest first, for threshold scans
+        self._by_score = np.argsort(-self.score_moves, kind="stable")
+        self._by_rank = np.argsort(-self.rank_moves, kind="stable")
+        self._messages: Dict[tuple, str] = {}
+
+    def positions(
+        self,
+        score_threshold: float,
+        rank_threshold: Optional[int] = None,
+        watch: Optional[FrozenSet[str]] = None,
+    ) -> np.ndarray:
+        """Ranking positions of agents that moved more than either threshold.
+
+        Biggest score moves first; restricted to `watch` if given.
+        """
+        if watch is not None:
+            ranks = (self.snap.rank(a) for a in watch)
+            positions = np.array(sorted(r - 1 for r in ranks if r is not None), dtype=np.int64)
+            moved = self.score_moves[positions] > score_threshold
+            if rank_threshold is not None:
+                moved |= self.rank_moves[positions] > rank_threshold
+            positions = positions[moved]
+        else:
+            count = np.searchsorted(-self.score_moves[self._by_score], -score_threshold)
+            positions = self._by_score[:count]
+            if rank_threshold is not None:
+                count = np.searchsorted(-self.rank_moves[self._by_rank], -rank_threshold)
+                positions = np.union1d(positions, self._by_rank[:count])
+        return positions[np.argsort(-self.score_moves[positions], kind="stable")]
+
+    def message(
+        self,
+        score_threshold: float,
+        rank_threshold: Optional[int],
+        watch: Optional[FrozenSet[str]],
+        limit: int,
+    ) -> str:
+        """JSON for one subscriber's view of this delta."""
+        key = (score_threshold, rank_threshold, watch, limit)
+        text = self._messages.get(key)
+        if text is None:
+            positions = self.positions(score_threshold, rank_threshold, watch)
+            agents, scores = self.snap.ranked_agents, self.snap.ranked_scores
+            changes = [
+                {
+                    "address": agents[p],
+                    "score": round(float(scores[p]), 4),
+                    "previous_score": round(float(self.old_scores[p]), 4),
+                    "rank": p + 1,
+                    "previous_rank": int(self.old_ranks[p]) or None,
+                }
+                for p in positions[:limit].tolist()
+            ]
+            text = dumps(
+                {
+                    "version": self.snap.version,
+                    "previous_version": self.previous.version,
+                    "computed_at": self.snap.computed_at.isoformat() + "Z",
+                    "changed": len(positions),
+                    "changes": changes,
+                }
+            ).decode()
+            self._messages[key] = text
+        return text
+
+
+class ScoreSubscriber:
+    """One stream client: its filters and a bounded queue of messages.
+
+    A client that falls `max_pending` messages behind has its backlog
+    dropped and replaced by a single "resync" message, telling it to
+    refetch the scores it cares about; the publisher never waits on it.
+    """
+
+    def __init__(
+        self,
+        score_threshold: float = 0.01,
+        rank_threshold: Optional[int] = None,
+        watch: Optional[Iterable[str]] = None,
+        limit: int = 100,
+        max_pending: int = 16,
+    ):
+        self.score_threshold = score_threshold
+        self.rank_threshold = rank_threshold
+        self.watch = frozenset(a.lower() for a in watch) if watch else None
+        self.limit = limit
+        self.queue: "asyncio.Queue[Message]" = asyncio.Queue(max_pending)
+        self.dropped = 0
+        self.resyncs = 0
+
+    def offer(self, message: Message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            dropped = self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.dropped += dropped
+            self.resyncs += 1
+            self.queue.put_nowait(("resync", dumps({"dropped": dropped}).decode()))
+
+
+class ScoreStream:
+    """Pushes score changes to subscribers after each recompute.
+
+    Polls `get_snapshot` every `interval_s`; when the version moves,
+    the delta against the previous snapshot is computed off the event
+    loop and fanned out to every subscriber's queue.
+    """
+
+    def __init__(
+        self,
+        get_snapshot: Callable[[], Awaitable[ScoreSnapshot]],
+        interval_s: float = 0.5,
+        max_pending: int = 16,
+        max_subscribers: int = 10000,
+    ):
+        self.get_snapshot = get_snapshot
+        self.interval_s = interval_s
+        self.max_pending = max_pending
+        self.max_subscribers = max_subscribers
+        self.subscribers: Set[ScoreSubscriber] = set()
+        self._snapshot: Optional[ScoreSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.last_delta_ms = 0.0
+        self.last_fanout_ms = 0.0
+        self.last_encoded = 0
+
+    def subscribe(self, **filters) -> Optional[ScoreSubscriber]:
+        """Register a subscriber, or return None when at capacity."""
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscriber = ScoreSubscriber(max_pending=self.max_pending, **filters)
+        version = self._snapshot.version if self._snapshot is not None else None
+        subscriber.offer(("ready", dumps({"version": version}).decode()))
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: ScoreSubscriber):
+        self.subscribers.discard(subscriber)
+
+    async def publish(self, snap: ScoreSnapshot):
+        """Send subscribers the changes from the last published snapshot to `snap`."""
+        previous, self._snapshot = self._snapshot, snap
+        if previous is None or not self.subscribers:
+            return
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        delta = await loop.run_in_executor(None, ScoreDelta, snap, previous)
+        fanout_started = time.perf_counter()
+        for subscriber in list(self.subscribers):
+            text = delta.message(
+                subscriber.score_threshold,
+                subscriber.rank_threshold,
+                subscriber.watch,
+                subscriber.limit,
+            )
+            subscriber.offer(("scores", text))
+        self.published += 1
+        self.last_delta_ms = (fanout_started - started) * 1000
+        self.last_fanout_ms = (time.perf_counter() - fanout_started) * 1000
+        self.last_encoded = len(delta._messages)
+
+    async def run(self):
+        while True:
+            try:
+                if not self.subscribers:
+                    # Nothing to diff for; start from fresh on the next subscriber
+                    self._snapshot = None
+                else:
+                    snap = await self.get_snapshot()
+                    if self._snapshot is None or snap.version != self._snapshot.version:
+                        await self.publish(snap)
+            except Exception as e:
+                print(f"Publishing score changes failed: {e}")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "max_subscribers": self.max_subscribers,
+            "version": self._snapshot.version if self._snapshot is not None else None,
+            "published": self.published,
+            "last_delta_ms": round(self.last_delta_ms, 3),
+            "last_fanout_ms": round(self.last_fanout_ms, 3),
+            "last_encoded": self.last_encoded,
+            "lagging": sum(1 for s in self.subscribers if s.queue.full()),
+            "resyncs": sum(s.resyncs for s in self.subscribers),
+        }
@@ -0,0 +1,60 @@
+"""Run the graph engine as one writer process plus read-only workers.
+
+    python serve.py --workers 4 --port 8000
+
+The writer owns the graph, persistence and recomputes, and listens on
+127.0.0.1 only. `--workers` reader processes serve the public port from
+the snapshots and specs it publishes to SHARED_STATE_DIR, and forward
+writes to it.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--writer-port", type=int, default=8001)
+    args = parser.parse_args()
+
+    uvicorn = [sys.executable, "-m", "uvicorn", "main:app"]
+    writer = subprocess.Popen(
+        uvicorn + ["--host", "127.0.0.1", "--port", str(args.writer_port)],
+        env=dict(os.environ, WORKER_ROLE="writer"),
+    )
+    readers = subprocess.Popen(
+        uvicorn
+        + ["--host", args.host, "--port", str(args.port), "--workers", str(args.workers)],
+        env=dict(
+            os.environ,
+            WORKER_ROLE="reader",
+            WRITER_URL=f"http://127.0.0.1:{args.writer_port}",
+        ),
+    )
+    processes = [writer, readers]
+
+    def shutdown(signum, frame):
+        for process in processes:
+            process.terminate()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    try:
+        # Exit (and take the other one down) as soon as either side dies.
+        while all(process.poll() is None for process in processes):
+            time.sleep(0.5)
+    finally:
+        shutdown(None, None)
+        for process in processes:
+            process.wait()
+    sys.exit(max(process.returncode or 0 for process in processes))
+
+
+if __name__ == "__main__":
+    main()
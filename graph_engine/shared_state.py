@@ -0,0 +1,261 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+
+from pagerank import DignitasPageRank, ScoreSnapshot
+from relevancy import RelevancyEngine
+
+MANIFEST = "CURRENT"
+KEEP_FILES = 3  # Older snapshot/spec files are deleted once superseded
+
+
+def _write_atomic(path: str, write):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SnapshotPublisher:
+    """Writer side of multi-worker mode.
+
+    Publishes the engine's latest score snapshot and the agent specs to
+    files in `directory` whenever either changes. A small JSON manifest,
+    replaced atomically, names the current files, so readers never see
+    a half-written snapshot.
+    """
+
+    def __init__(
+        self,
+        engine: DignitasPageRank,
+        relevancy_engine: RelevancyEngine,
+        directory: str,
+        interval_s: float = 0.2,
+    ):
+        self.engine = engine
+        self.relevancy_engine = relevancy_engine
+        self.directory = directory
+        self.interval_s = interval_s
+        self.manifest: Optional[dict] = None
+        self.publish_count = 0
+        # Versions restart with the process; this tells runs apart
+        self.boot_id = os.urandom(4).hex()
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+        # The writer owns the directory; files from a previous run may
+        # carry higher version numbers than this run will publish.
+        for name in os.listdir(directory):
+            if name == MANIFEST or name.startswith(("scores-", "specs-")):
+                os.remove(os.path.join(directory, name))
+
+    @classmethod
+    def from_env(
+        cls, engine: DignitasPageRank, relevancy_engine: RelevancyEngine
+    ) -> "SnapshotPublisher":
+        return cls(
+            engine,
+            relevancy_engine,
+            os.getenv("SHARED_STATE_DIR", "shared_state"),
+            interval_s=float(os.getenv("SHARED_STATE_POLL_S", "0.2")),
+        )
+
+    def publish(self) -> bool:
+        """Write out whatever changed since the last publish."""
+        snap = self.engine.latest_snapshot()
+        specs_version = self.relevancy_engine.specs_version
+        manifest = dict(self.manifest or {})
+
+        if not self.manifest or self.manifest["snapshot"]["version"] != snap.version:
+            name = f"scores-{snap.version:012d}.npz"
+            _write_atomic(
+                os.path.join(self.directory, name),
+                lambda f: np.savez(
+                    f,
+                    agents=np.array([a.encode() for a in snap.ranked_agents], dtype=bytes),
+                    scores=snap.ranked_scores,
+                ),
+            )
+            manifest["snapshot"] = {
+                "file": name,
+                "version": snap.version,
+                "computed_at": snap.computed_at.isoformat(),
+                "compute_ms": snap.compute_ms,
+                "method": snap.method,
+            }
+
+        if not self.manifest or self.manifest["specs"]["version"] != specs_version:
+            name = f"specs-{specs_version:012d}.json"
+            specs = dict(self.relevancy_engine.agent_specs)
+            _write_atomic(
+                os.path.join(self.directory, name), lambda f: f.write(json.dumps(specs).encode())
+            )
+            manifest["specs"] = {"file": name, "version": specs_version}
+
+        if manifest == self.manifest:
+            return False
+        manifest["boot_id"] = self.boot_id
+        manifest["published_at"] = time.time()
+        _write_atomic(
+            os.path.join(self.directory, MANIFEST), lambda f: f.write(json.dumps(manifest).encode())
+        )
+        self.manifest = manifest
+        self.publish_count += 1
+        self._cleanup()
+        return True
+
+    def _cleanup(self):
+        current = {self.manifest["snapshot"]["file"], self.manifest["specs"]["file"]}
+        for prefix in ("scores-", "specs-"):
+            names = sorted(
+                n for n in os.listdir(self.directory)
+                if n.startswith(prefix) and not n.endswith(".tmp")
+            )
+            for name in names[:-KEEP_FILES]:
+                if name not in current:
+                    os.remove(os.path.join(self.directory, name))
+
+    def start(self):
+        """Publish now, then keep publishing from a background thread."""
+        self.publish()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="state-publisher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Publishing shared state failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+            self._thread = None
+
+
+class SnapshotSubscriber:
+    """Read-only worker side of multi-worker mode.
+
+    Polls the manifest written by a SnapshotPublisher and swaps in new
+    score snapshots and spec updates as they appear.
+    """
+
+    def __init__(
+        self, relevancy_engine: RelevancyEngine, directory: str, interval_s: float = 0.2
+    ):
+        self.relevancy_engine = relevancy_engine
+        self.directory = directory
+        self.interval_s = interval_s
+        self._snapshot = ScoreSnapshot({}, 0, 0.0)
+        self._loaded: Tuple[Optional[str], Optional[str]] = (None, None)
+        self.manifest: Optional[dict] = None
+        self.last_refresh_at: Optional[float] = None
+        self.refresh_count = 0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, relevancy_engine: RelevancyEngine) -> "SnapshotSubscriber":
+        return cls(
+            relevancy_engine,
+            os.getenv("SHARED_STATE_DIR", "shared_state"),
+            interval_s=float(os.getenv("SHARED_STATE_POLL_S", "0.2")),
+        )
+
+    def snapshot(self) -> ScoreSnapshot:
+        return self._snapshot
+
+    def refresh(self) -> bool:
+        """Load the published snapshot and specs if they changed."""
+        try:
+            with open(os.path.join(self.directory, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+        snapshot_file = manifest["snapshot"]["file"]
+        specs_file = manifest["specs"]["file"]
+        if (snapshot_file, specs_file) == self._loaded:
+            return False
+
+        if specs_file != self._loaded[1]:
+            with open(os.path.join(self.directory, specs_file)) as f:
+                specs = json.load(f)
+            for address, spec in specs.items():
+                # No-op for unchanged specs
+                self.relevancy_engine.register_agent(address, spec)
+
+        if snapshot_file != self._loaded[0]:
+            meta = manifest["snapshot"]
+            with np.load(os.path.join(self.directory, snapshot_file)) as data:
+                agents = np.char.decode(data["agents"]).tolist()
+                scores = data["scores"]
+            self._snapshot = ScoreSnapshot.from_ranked(
+                agents,
+                scores,
+                meta["version"],
+                meta["compute_ms"],
+                meta["method"],
+                datetime.fromisoformat(meta["computed_at"]),
+            )
+
+        self._loaded = (snapshot_file, specs_file)
+        self.manifest = manifest
+        self.last_refresh_at = time.time()
+        self.refresh_count += 1
+        return True
+
+    def start(self, wait_s: float = 30.0):
+        """Wait up to `wait_s` for a first publish, then poll in the background."""
+        deadline = time.monotonic() + wait_s
+        while not self._safe_refresh() and time.monotonic() < deadline:
+            time.sleep(self.interval_s)
+        if self.last_refresh_at is None:
+            print(f"No shared state in {self.directory} yet; serving empty scores")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="state-subscriber", daemon=True)
+        self._thread.start()
+
+    def _safe_refresh(self) -> bool:
+        try:
+            return self.refresh()
+        except (OSError, ValueError, KeyError) as e:
+            # Files can be replaced or cleaned up mid-read; retry next poll.
+            print(f"Loading shared state failed: {e}")
+            return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self._safe_refresh()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+            self._thread = None
+
+    def status(self) -> dict:
+        snap = self._snapshot
+        return {
+            "role": "reader",
+            "snapshot_version": snap.version,
+            "snapshot_age_s": round(snap.age_seconds(), 3),
+            "specs_version": self.manifest["specs"]["version"] if self.manifest else None,
+            "last_refresh_age_s": (
+                round(time.time() - self.last_refresh_at, 3)
+                if self.last_refresh_at is not None
+                else None
+            ),
+            "refresh_count": self.refresh_count,
+        }
@@ -0,0 +1,239 @@
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Repeat counts per spec field, so a term in the name or capabilities
+# counts for more than one buried in the description.
+FIELD_WEIGHTS = {
+    "name": 2,
+    "capabilities": 2,
+    "tags": 2,
+    "category": 1,
+    "description": 1,
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with a light suffix strip ("flights" -> "flight")."""
+    tokens = []
+    for token in re.findall(r"\w+", text.lower()):
+        for suffix in ("ing", "es", "ed", "s"):
+            if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                token = token[: -len(suffix)]
+                break
+        tokens.append(token)
+    return tokens
+
+
+def spec_terms(spec: dict) -> List[str]:
+    """Weighted bag of terms for an agent spec."""
+    terms = []
+    for field, repeat in FIELD_WEIGHTS.items():
+        value = spec.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(str(v) for v in value)
+        terms.extend(tokenize(str(value)) * repeat)
+    return terms
+
+
+class SpecIndex:
+    """In-memory BM25 index over agent specs.
+
+    Postings are updated in place on every register, so a query only
+    touches the agents that share a term with it. For scoring every
+    agent at once, each agent also gets a stable integer id and each
+    term's postings are cached as numpy arrays until the term changes.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_length: Dict[str, int] = {}
+        self.total_length = 0
+        self.ids: Dict[str, int] = {}
+        self.addresses: List[str] = []
+        self._lengths = np.zeros(1024)
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+
+    def add(self, address: str, spec: dict):
+        """Index (or re-index) an agent's spec."""
+        self.remove(address)
+        counts: Dict[str, int] = {}
+        for term in spec_terms(spec):
+            counts[term] = counts.get(term, 0) + 1
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[address] = tf
+            self._arrays.pop(term, None)
+        self.doc_terms[address] = counts
+        length = sum(counts.values())
+        self.doc_length[address] = length
+        self.total_length += length
+
+        doc_id = self.ids.get(address)
+        if doc_id is None:
+            doc_id = self.ids[address] = len(self.addresses)
+            self.addresses.append(address)
+            if doc_id >= len(self._lengths):
+                self._lengths = np.concatenate([self._lengths, np.zeros(len(self._lengths))])
+        self._lengths[doc_id] = length
+
+    def remove(self, address: str):
+        counts = self.doc_terms.pop(address, None)
+        if counts is None:
+            return
+        for term in counts:
+            docs = self.postings[term]
+            del docs[address]
+            if not docs:
+                del self.postings[term]
+            self._arrays.pop(term, None)
+        self.total_length -= self.doc_length.pop(address)
+        self._lengths[self.ids[address]] = 0
+
+    def search(
+        self, query: str, candidates: Optional[Iterable[str]] = None
+    ) -> Dict[str, float]:
+        """BM25 scores for `query`, scaled so the best match is 1.0.
+
+        Only agents sharing at least one term with the query appear in
+        the result; with `candidates`, scores are restricted to (and
+        scaled within) that set.
+        """
+        n = len(self.doc_terms)
+        if not n:
+            return {}
+        allowed = set(candidates) if candidates is not None else None
+        avg_length = self.total_length / n
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            if allowed is not None and len(allowed) < len(docs):
+                matches = [(a, docs[a]) for a in allowed if a in docs]
+            else:
+                matches = [(a, tf) for a, tf in docs.items() if allowed is None or a in allowed]
+            for address, tf in matches:
+                norm = self.K1 * (1 - self.B + self.B * self.doc_length[address] / avg_length)
+                scores[address] = scores.get(address, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        if not scores:
+            return {}
+        best = max(scores.values())
+        return {address: score / best for address, score in scores.items()}
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(doc ids, term frequencies) of a term's postings."""
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            docs = self.postings.get(term)
+            if not docs:
+                return None
+            ids = np.fromiter((self.ids[a] for a in docs), dtype=np.int64, count=len(docs))
+            tfs = np.fromiter(docs.values(), dtype=float, count=len(docs))
+            arrays = self._arrays[term] = (ids, tfs)
+        return arrays
+
+    def score_matches(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids of every agent matching `query` (ascending) and their scores.
+
+        Same scores as search(), best match scaled to 1.0, computed over
+        whole postings arrays instead of agent by agent.
+        """
+        size = len(self.addresses)
+        n = len(self.doc_terms)
+        all_ids, all_scores = [], []
+        lengths = self._lengths[:size]
+        avg_length = self.total_length / n if n else 0.0
+        for term in set(tokenize(query)):
+            arrays = self._term_arrays(term)
+            if arrays is None:
+                continue
+            ids, tfs = arrays
+            if ids.max() >= size:
+                # Registered while we were scoring; picked up next query
+                keep = ids < size
+                ids, tfs = ids[keep], tfs[keep]
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = self.K1 * (1 - self.B + self.B * lengths[ids] / avg_length)
+            all_ids.append(ids)
+            all_scores.append(idf * tfs * (self.K1 + 1) / (tfs + norm))
+        if not all_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        ids, position = np.unique(np.concatenate(all_ids), return_inverse=True)
+        scores = np.bincount(position, weights=np.concatenate(all_scores))
+        return ids, scores / scores.max()
+
+
+class FacetIndex:
+    """Inverted index from category, tag and capability to agent addresses.
+
+    Values are matched case-insensitively; filtering intersects the
+    posting sets, smallest first.
+    """
+
+    FIELDS = ("category", "tags", "capabilities")
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, Set[str]]] = {f: {} for f in self.FIELDS}
+        self.doc_values: Dict[str, Dict[str, Set[str]]] = {}
+
+    @staticmethod
+    def _values(spec: dict, field: str) -> Set[str]:
+        value = spec.get(field) or []
+        if isinstance(value, str):
+            value = [value]
+        return {str(v).strip().lower() for v in value if str(v).strip()}
+
+    def add(self, address: str, spec: dict):
+        """Index (or re-index) an agent's facets."""
+        self.remove(address)
+        values = {field: self._values(spec, field) for field in self.FIELDS}
+        for field, keys in values.items():
+            for key in keys:
+                self.postings[field].setdefault(key, set()).add(address)
+        self.doc_values[address] = values
+
+    def remove(self, address: str):
+        values = self.doc_values.pop(address, None)
+        if values is None:
+            return
+        for field, keys in values.items():
+            for key in keys:
+                docs = self.postings[field][key]
+                docs.discard(address)
+                if not docs:
+                    del self.postings[field][key]
+
+    def filter(
+        self,
+        category: Optional[str] = None,
+        tags: Iterable[str] = (),
+        capabilities: Iterable[str] = (),
+    ) -> Optional[Set[str]]:
+        """Agents matching the category and all given tags/capabilities.
+
+        Returns None when no filter is given, meaning "all agents".
+        """
+        wanted = [("category", category)] if category else []
+        wanted += [("tags", t) for t in tags]
+        wanted += [("capabilities", c) for c in capabilities]
+        wanted = [(field, v.strip().lower()) for field, v in wanted if v.strip()]
+        if not wanted:
+            return None
+        sets = [self.postings[field].get(value, set()) for field, value in wanted]
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            if not result:
+                break
+            result &= other
+        return result
@@ -0,0 +1,426 @@
+import io
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from pagerank import DignitasPageRank
+from relevancy import RelevancyEngine
+
+# Log record layouts. Interactions: kind, unix timestamp, then the
+# lengths of the from/to/type strings followed by their UTF-8 bytes.
+# Specs: kind, length of the JSON payload, then the payload.
+_INTERACTION = struct.Struct("<cdHHH")
+_SPEC = struct.Struct("<cI")
+_KIND_INTERACTION = b"I"
+_KIND_SPEC = b"S"
+
+Interaction = Tuple[str, str, str, datetime]
+
+
+class InteractionLog:
+    """Append-only log of interactions and agent specs, split into segments.
+
+    Appends go through a buffered file; a flusher thread fsyncs at most
+    every `fsync_interval_s`, so a crash loses at most that window.
+    """
+
+    def __init__(self, directory: str, fsync_interval_s: float = 0.05):
+        self.directory = directory
+        self.fsync_interval_s = fsync_interval_s
+        self._lock = threading.Lock()
+        self._file: Optional[io.BufferedWriter] = None
+        self._dirty = False
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.segment = 0
+        self.records_since_rotate = 0
+
+    @staticmethod
+    def segment_path(directory: str, segment: int) -> str:
+        return os.path.join(directory, f"log-{segment:012d}.bin")
+
+    @staticmethod
+    def segments(directory: str) -> List[int]:
+        """Existing segment numbers, oldest first."""
+        found = []
+        for name in os.listdir(directory):
+            if name.startswith("log-") and name.endswith(".bin"):
+                found.append(int(name[4:-4]))
+        return sorted(found)
+
+    def open(self, segment: int):
+        """Start appending to a fresh segment and start the fsync thread."""
+        with self._lock:
+            self._open_segment(segment)
+        self._stop.clear()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="interaction-log-fsync", daemon=True
+        )
+        self._flusher.start()
+
+    def _open_segment(self, segment: int):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+        self.segment = segment
+        self.records_since_rotate = 0
+        self._file = open(self.segment_path(self.directory, segment), "ab")
+
+    def rotate(self) -> int:
+        """Switch to the next segment; returns the new segment number."""
+        with self._lock:
+            self._open_segment(self.segment + 1)
+            return self.segment
+
+    def append_interactions(self, interactions: Iterable[Interaction]):
+        parts = []
+        for from_agent, to_agent, interaction_type, timestamp in interactions:
+            src = from_agent.encode()
+            dst = to_agent.encode()
+            kind = interaction_type.encode()
+            parts.append(
+                _INTERACTION.pack(
+                    _KIND_INTERACTION,
+                    _to_unix(timestamp),
+                    len(src),
+                    len(dst),
+                    len(kind),
+                )
+            )
+            parts.append(src + dst + kind)
+        self._write(b"".join(parts), len(parts) // 2)
+
+    def append_spec(self, address: str, spec: dict):
+        payload = json.dumps({"address": address, "spec": spec}).encode()
+        self._write(_SPEC.pack(_KIND_SPEC, len(payload)) + payload, 1)
+
+    def _write(self, data: bytes, records: int):
+        with self._lock:
+            self._file.write(data)
+            self._dirty = True
+            self.records_since_rotate += records
+
+    def _sync(self):
+        if self._file is not None and self._dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.fsync_interval_s):
+            with self._lock:
+                self._sync()
+
+    def close(self):
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def read_segment(path: str) -> Iterator[Tuple[bytes, object]]:
+        """Yield (kind, record) pairs from one segment.
+
+        A torn record at the end of the file (crash mid-write) is cut
+        off so the segment can be replayed cleanly next time.
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        offset = 0
+        size = len(data)
+        while offset < size:
+            kind = data[offset:offset + 1]
+            if kind == _KIND_INTERACTION and offset + _INTERACTION.size <= size:
+                _, ts, n_src, n_dst, n_kind = _INTERACTION.unpack_from(data, offset)
+                start = offset + _INTERACTION.size
+                end = start + n_src + n_dst + n_kind
+                if end > size:
+                    break
+                yield kind, (
+                    data[start:start + n_src].decode(),
+                    data[start + n_src:start + n_src + n_dst].decode(),
+                    data[start + n_src + n_dst:end].decode(),
+                    _from_unix(ts),
+                )
+            elif kind == _KIND_SPEC and offset + _SPEC.size <= size:
+                _, length = _SPEC.unpack_from(data, offset)
+                start = offset + _SPEC.size
+                end = start + length
+                if end > size:
+                    break
+                yield kind, json.loads(data[start:end])
+            else:
+                break
+            offset = end
+        if offset < size:
+            print(f"Truncating torn tail of {path} at byte {offset}")
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+
+
+class Persistence:
+    """Durable write path for the graph engine and agent registry.
+
+    Every write is logged before it is applied. Snapshots of the edge
+    table and agent specs are written periodically; startup loads the
+    latest snapshot and replays only the log segments written after it.
+    With no data directory, writes are applied without being logged.
+    """
+
+    REPLAY_BATCH = 100_000
+
+    def __init__(
+        self,
+        engine: DignitasPageRank,
+        relevancy_engine: RelevancyEngine,
+        data_dir: Optional[str] = None,
+        snapshot_interval_s: float = 600.0,
+        fsync_interval_s: float = 0.05,
+    ):
+        self.engine = engine
+        self.relevancy_engine = relevancy_engine
+        self.data_dir = data_dir
+        self.snapshot_interval_s = snapshot_interval_s
+        self.log = InteractionLog(data_dir, fsync_interval_s) if data_dir else None
+        # Held across "log then apply" and across log rotation, so the
+        # interaction count read at rotation matches the retired segments.
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshotter: Optional[threading.Thread] = None
+        self.last_recovery: dict = {}
+
+    @classmethod
+    def from_env(
+        cls, engine: DignitasPageRank, relevancy_engine: RelevancyEngine
+    ) -> "Persistence":
+        """Build from DATA_DIR, SNAPSHOT_INTERVAL_S and LOG_FSYNC_INTERVAL_MS."""
+        return cls(
+            engine,
+            relevancy_engine,
+            data_dir=os.getenv("DATA_DIR") or None,
+            snapshot_interval_s=float(os.getenv("SNAPSHOT_INTERVAL_S", "600")),
+            fsync_interval_s=float(os.getenv("LOG_FSYNC_INTERVAL_MS", "50")) / 1000,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.log is not None
+
+    # --- Write path ---
+
+    def add_interaction(
+        self,
+        from_agent: str,
+        to_agent: str,
+        interaction_type: str,
+        timestamp: Optional[datetime] = None,
+    ):
+        timestamp = timestamp or datetime.utcnow()
+        with self._lock:
+            if self.log:
+                self.log.append_interactions([(from_agent, to_agent, interaction_type, timestamp)])
+            self.engine.add_interaction(from_agent, to_agent, interaction_type, timestamp)
+
+    def add_interactions(self, interactions: List[Tuple[str, str, str, Optional[datetime]]]) -> int:
+        now = datetime.utcnow()
+        interactions = [(u, v, t, ts or now) for u, v, t, ts in interactions]
+        with self._lock:
+            if self.log:
+                self.log.append_interactions(interactions)
+            return self.engine.add_interactions(interactions)
+
+    def register_agent(self, address: str, spec: dict):
+        with self._lock:
+            if self.log:
+                self.log.append_spec(address, spec)
+            self.relevancy_engine.register_agent(address, spec)
+
+    # --- Snapshots and recovery ---
+
+    def _snapshot_path(self, segment: int) -> str:
+        return os.path.join(self.data_dir, f"snapshot-{segment:012d}.npz")
+
+    def _snapshots(self) -> List[int]:
+        found = []
+        for name in os.listdir(self.data_dir):
+            if name.startswith("snapshot-") and name.endswith(".npz"):
+                found.append(int(name[9:-4]))
+        return sorted(found)
+
+    def snapshot(self) -> Optional[str]:
+        """Write a snapshot covering every log segment before the current one.
+
+        The edge table is exported after the lock is released, since the
+        export waits for any running recompute; writes landing meanwhile
+        may be in it too, and the snapshot records how many interactions
+        of its first segment it already holds so replay skips them.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            segment = self.log.rotate()
+            rotated_count = self.engine.interaction_count
+            specs = dict(self.relevancy_engine.get_all_specs())
+        state = self.engine.export_state()
+
+        path = self._snapshot_path(segment)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                nodes=np.frombuffer("\n".join(state["nodes"]).encode(), dtype=np.uint8),
+                src=state["src"],
+                dst=state["dst"],
+                weight=state["weight"],
+                meta=np.frombuffer(
+                    json.dumps(
+                        {
+                            "decay_epoch": _to_unix(state["decay_epoch"]),
+                            "interaction_count": state["interaction_count"],
+                            "segment_skip": state["interaction_count"] - rotated_count,
+                        }
+                    ).encode(),
+                    dtype=np.uint8,
+                ),
+                specs=np.frombuffer(json.dumps(specs).encode(), dtype=np.uint8),
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+        # Older snapshots and the segments they cover are now redundant.
+        for old in self._snapshots():
+            if old < segment:
+                os.remove(self._snapshot_path(old))
+        for old in InteractionLog.segments(self.data_dir):
+            if old < segment:
+                os.remove(InteractionLog.segment_path(self.data_dir, old))
+        return path
+
+    def recover(self) -> bool:
+        """Load the latest snapshot, replay the log tail and open the log.
+
+        Returns True if any persisted state was found.
+        """
+        if not self.enabled:
+            return False
+        os.makedirs(self.data_dir, exist_ok=True)
+        started = time.perf_counter()
+        snapshots = self._snapshots()
+        base = snapshots[-1] if snapshots else 0
+        skip = self._load_snapshot(self._snapshot_path(base)) if snapshots else 0
+        loaded_s = time.perf_counter() - started
+
+        replayed = 0
+        segments = [s for s in InteractionLog.segments(self.data_dir) if s >= base]
+        for segment in segments:
+            path = InteractionLog.segment_path(self.data_dir, segment)
+            replayed += self._replay(path, skip if segment == base else 0)
+        total_s = time.perf_counter() - started
+
+        next_segment = max([base] + segments) + 1
+        self.log.open(next_segment)
+        self.last_recovery = {
+            "snapshot": base or None,
+            "snapshot_load_s": round(loaded_s, 3),
+            "replayed_records": replayed,
+            "replay_per_s": round(replayed / (total_s - loaded_s), 1) if replayed else None,
+            "total_s": round(total_s, 3),
+        }
+        print(f"Recovered state from {self.data_dir}: {self.last_recovery}")
+        return bool(snapshots or replayed)
+
+    def _load_snapshot(self, path: str) -> int:
+        """Restore a snapshot; returns how many interactions of its segment it holds."""
+        with np.load(path) as data:
+            nodes_blob = data["nodes"].tobytes().decode()
+            nodes = nodes_blob.split("\n") if nodes_blob else []
+            meta = json.loads(data["meta"].tobytes())
+            specs = json.loads(data["specs"].tobytes())
+            self.engine.restore_state(
+                nodes,
+                data["src"],
+                data["dst"],
+                data["weight"],
+                decay_epoch=_from_unix(meta["decay_epoch"]),
+                interaction_count=meta["interaction_count"],
+            )
+        for address, spec in specs.items():
+            self.relevancy_engine.register_agent(address, spec)
+        return meta.get("segment_skip", 0)
+
+    def _replay(self, path: str, skip: int = 0) -> int:
+        """Apply a log segment, except its first `skip` interactions."""
+        batch = []
+        count = 0
+        for kind, record in InteractionLog.read_segment(path):
+            if kind == _KIND_INTERACTION and skip:
+                skip -= 1
+                continue
+            count += 1
+            if kind == _KIND_INTERACTION:
+                batch.append(record)
+                if len(batch) >= self.REPLAY_BATCH:
+                    self.engine.add_interactions(batch)
+                    batch = []
+            else:
+                if batch:
+                    self.engine.add_interactions(batch)
+                    batch = []
+                self.relevancy_engine.register_agent(record["address"], record["spec"])
+        if batch:
+            self.engine.add_interactions(batch)
+        return count
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Start periodic snapshots."""
+        if not self.enabled or self._snapshotter is not None:
+            return
+        self._stop.clear()
+        self._snapshotter = threading.Thread(
+            target=self._snapshot_loop, name="state-snapshot", daemon=True
+        )
+        self._snapshotter.start()
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.snapshot_interval_s):
+            if self.log.records_since_rotate == 0:
+                continue
+            try:
+                self.snapshot()
+            except Exception as e:
+                print(f"Snapshot failed: {e}")
+
+    def close(self):
+        """Write a final snapshot and close the log."""
+        if not self.enabled:
+            return
+        self._stop.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+            self._snapshotter = None
+        if self.log.records_since_rotate:
+            self.snapshot()
+        self.log.close()
+
+
+def _to_unix(timestamp: datetime) -> float:
+    """Seconds since the Unix epoch for a naive UTC datetime."""
+    return (timestamp - datetime(1970, 1, 1)).total_seconds()
+
+
+def _from_unix(seconds: float) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=seconds)